@@ -8,23 +8,51 @@ class Haulm:
     def set_dados_modificados(self, dados, metadata, origem, destino):
         self.modelo.set_dados_modificados(dados, metadata, origem, destino)
 
-    def set_regras_parametros(self, min_repetition, min_confidence , janela_tempo):
-        self.modelo.set_regras_parametros(min_repetition, min_confidence , janela_tempo)
+    def set_regras_parametros(self, min_repetition, min_confidence , janela_tempo, modo_baldes='kmeans', comprimento_janela=None, passo_janela=None, motor='auto', alvo='regras', top_k=None, criterio_top_k='confianca'):
+        self.modelo.set_regras_parametros(min_repetition, min_confidence , janela_tempo, modo_baldes, comprimento_janela, passo_janela, motor, alvo, top_k, criterio_top_k)
 
     def get_regras(self):
         return self.modelo.buscar_regras()
 
+    def submeter_busca_regras(self):
+        return self.modelo.submeter_busca_regras()
+
+    def get_status_busca(self, id_tarefa):
+        return self.modelo.get_status_busca(id_tarefa)
+
+    def get_resultado_busca(self, id_tarefa):
+        return self.modelo.get_resultado_busca(id_tarefa)
+
     
     def get_itemsets(self):
         return self.modelo.get_itemsets()
 
+    def get_filhos_arvore(self, no=None, offset=0, limite=100):
+        return self.modelo.get_filhos_arvore(no, offset, limite)
+
     def get_dados_originais(self):
         return self.modelo.dados_originais.data
     
     def get_dados_originais_ordenados(self):
         return self.modelo.get_dados_originais_ordenado()
+
+    def get_pagina_dados_originais(self, offset=0, limite=100, ordenar=None, crescente=True, filtros=None):
+        return self.modelo.get_pagina_dados_originais(offset, limite, ordenar, crescente, filtros)
     
     def get_dados_com_cluster(self):
         return self.modelo.get_dados_com_cluster()
 
+    def get_mascara_destaque(self, pares=None):
+        return self.modelo.mascara_destaque(pares)
+
+    def set_regra_escolhida(self, pares):
+        self.modelo.set_regra_escolhida(pares)
+
+    def get_mascara_regra_escolhida(self):
+        return self.modelo.mascara_regra_escolhida
+
+    def get_historico_k(self):
+        return self.modelo.get_historico_k()
 
+    def get_tempos_motores(self):
+        return self.modelo.get_tempos_motores()
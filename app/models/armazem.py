@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .baldes import baldesCSR
+from .janelas import janelasDeslizantes
+from .metricas import METRICAS
+
+# versao do formato gravado; arquivos de outra versao sao ignorados
+VERSAO = 2
+# numero padrao de resultados mantidos em disco
+MAX_RESULTADOS = 32
+
+
+def _csr(sequencias):
+    # sequencias de ids inteiros -> (indptr, itens), como nos baldes
+    tamanhos = np.fromiter((len(s) for s in sequencias), dtype=np.int64, count=len(sequencias))
+    indptr = np.concatenate(([0], np.cumsum(tamanhos)))
+    itens = np.fromiter((i for s in sequencias for i in s), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, itens
+
+
+def _sequencias(indptr, itens):
+    itens = itens.tolist()
+    return [tuple(itens[inicio:fim]) for inicio, fim in zip(indptr[:-1].tolist(), indptr[1:].tolist())]
+
+
+class armazemResultados:
+    # resultados de buscas de regras gravados em disco, para sobreviver a um
+    # reinicio do app. Cada busca (hash do dataset + parametros) vira um .npz
+    # com itemsets, baldes e regras em vetores numericos (ids das arestas em
+    # CSR) e um .pkl com os dados clusterizados. Nada e lido na subida: o
+    # arquivo so e carregado quando uma busca com a mesma chave e pedida.
+    # A escrita acontece numa thread separada, fora do caminho da busca, e
+    # so os max_resultados usados mais recentemente ficam no diretorio.
+    def __init__(self, diretorio='resultados', max_resultados=MAX_RESULTADOS):
+        self.diretorio = diretorio
+        self.max_resultados = max_resultados
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # escritas agendadas por caminho, para carregar() esperar a que falta
+        self.pendentes = {}
+        self.trava = threading.Lock()
+
+    def caminho(self, chave):
+        nome = hashlib.sha1(repr(chave).encode()).hexdigest()
+        return os.path.join(self.diretorio, nome)
+
+    def salvar(self, chave, estado):
+        caminho = self.caminho(chave)
+        with self.trava:
+            self.pendentes = {c: f for c, f in self.pendentes.items() if not f.done()}
+            self.pendentes[caminho] = self.executor.submit(self.escrever, caminho, estado)
+
+    def aguardar(self):
+        with self.trava:
+            pendentes = list(self.pendentes.values())
+            self.pendentes = {}
+        for futuro in pendentes:
+            futuro.result()
+
+    def escrever(self, caminho, estado):
+        os.makedirs(self.diretorio, exist_ok=True)
+        regras = estado['regras']
+        itemsets = estado['itemsets'] or []
+        baldes = estado['baldes']
+        rotulos = estado['rotulos']
+
+        vetores = {}
+        vetores['itemsets_indptr'], vetores['itemsets_itens'] = _csr([i for i, _ in itemsets])
+        vetores['itemsets_suporte'] = np.array([s for _, s in itemsets], dtype=np.int64)
+        vetores['antecedentes_indptr'], vetores['antecedentes_itens'] = _csr(regras['Antecedente'].tolist())
+        for coluna in ('Consequente', 'FR', 'FA', 'FC', 'Conf') + METRICAS:
+            vetores['regras_' + coluna] = regras[coluna].to_numpy()
+        # rotulos: pares (origem, destino) indexados pelo id da aresta
+        vetores['rotulos_origem'] = np.array([r[0] if r is not None else None for r in rotulos])
+        vetores['rotulos_destino'] = np.array([r[1] if r is not None else None for r in rotulos])
+        if isinstance(baldes, janelasDeslizantes):
+            vetores['baldes_timestamps'] = baldes.timestamps
+            vetores['baldes_itens'] = baldes.itens
+            janela = [baldes.comprimento, baldes.passo]
+        else:
+            vetores['baldes_indptr'] = baldes.indptr
+            vetores['baldes_itens'] = baldes.itens
+            janela = None
+        vetores['info'] = np.array(json.dumps({
+            'versao': VERSAO,
+            'janela': janela,
+            'historico_k': estado['historico_k'],
+            'tempos_motores': estado['tempos_motores'],
+            'min_rep_itemsets': estado['min_rep_itemsets'],
+            'assinatura_itemsets': estado['assinatura_itemsets'],
+        }, default=lambda valor: valor.item()))
+
+        # grava em arquivo temporario e renomeia: um reinicio no meio da
+        # escrita nao deixa um resultado pela metade
+        with open(caminho + '.tmp', 'wb') as arquivo:
+            np.savez(arquivo, **vetores)
+        if estado['dados_com_cluster'] is not None:
+            estado['dados_com_cluster'].to_pickle(caminho + '.pkl.tmp')
+            os.replace(caminho + '.pkl.tmp', caminho + '.pkl')
+        os.replace(caminho + '.tmp', caminho + '.npz')
+        self.limitar()
+
+    def limitar(self):
+        # apaga os resultados usados ha mais tempo (pela data de modificacao,
+        # renovada a cada leitura) alem de max_resultados
+        nomes = [nome[:-len('.npz')] for nome in os.listdir(self.diretorio) if nome.endswith('.npz')]
+        if len(nomes) <= self.max_resultados:
+            return
+        caminhos = sorted((os.path.join(self.diretorio, nome) for nome in nomes), key=lambda c: os.path.getmtime(c + '.npz'))
+        for caminho in caminhos[:len(caminhos) - self.max_resultados]:
+            for extensao in ('.npz', '.pkl'):
+                if os.path.exists(caminho + extensao):
+                    os.remove(caminho + extensao)
+
+    def carregar(self, chave):
+        # estado no formato de ruleFinder.estado(), ou None se nao houver
+        caminho = self.caminho(chave)
+        with self.trava:
+            futuro = self.pendentes.get(caminho)
+        if futuro is not None and futuro.exception() is not None:
+            return None
+        if not os.path.exists(caminho + '.npz'):
+            return None
+        os.utime(caminho + '.npz')
+        # os rotulos podem ser objetos (contas em texto e numero misturadas)
+        with np.load(caminho + '.npz', allow_pickle=True) as vetores:
+            info = json.loads(str(vetores['info']))
+            if info.get('versao') != VERSAO:
+                return None
+            suportes = vetores['itemsets_suporte'].tolist()
+            itemsets = list(zip(_sequencias(vetores['itemsets_indptr'], vetores['itemsets_itens']), suportes))
+            regras = pd.DataFrame({'Antecedente': _sequencias(vetores['antecedentes_indptr'], vetores['antecedentes_itens'])})
+            for coluna in ('Consequente', 'FR', 'FA', 'FC', 'Conf') + METRICAS:
+                regras[coluna] = vetores['regras_' + coluna]
+            rotulos = [None if o is None else (o, d) for o, d in zip(vetores['rotulos_origem'].tolist(), vetores['rotulos_destino'].tolist())]
+            if info['janela'] is not None:
+                comprimento, passo = info['janela']
+                baldes = janelasDeslizantes(vetores['baldes_timestamps'], vetores['baldes_itens'], comprimento, passo)
+            else:
+                baldes = baldesCSR(vetores['baldes_indptr'], vetores['baldes_itens'])
+        dados_com_cluster = pd.read_pickle(caminho + '.pkl') if os.path.exists(caminho + '.pkl') else None
+        assinatura = info['assinatura_itemsets']
+        return {'regras': regras, 'rotulos': rotulos, 'baldes': baldes,
+                'dados_com_cluster': dados_com_cluster, 'historico_k': info['historico_k'],
+                'tempos_motores': info['tempos_motores'], 'itemsets': itemsets,
+                'min_rep_itemsets': info['min_rep_itemsets'],
+                'assinatura_itemsets': tuple(assinatura) if assinatura is not None else None}
@@ -0,0 +1,47 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# artefatos intermediarios que a busca de regras sabe entregar a um gravador
+ARTEFATOS = ('dados_com_cluster', 'baldes', 'regras')
+
+
+class gravadorArtefatos:
+    # destino opcional dos artefatos intermediarios da busca de regras.
+    # A escrita acontece numa thread separada, fora do caminho da busca, em
+    # formato binario: DataFrames em pickle, baldes CSR em .npz e o resto em
+    # pickle. Os artefatos de cada busca ficam num subdiretorio proprio, com
+    # o nome dado por 'busca', para buscas seguidas ou simultaneas nao
+    # sobrescreverem umas as outras. Qualquer objeto com um metodo
+    # gravar(nome, objeto, busca) pode ser usado no lugar deste.
+    def __init__(self, diretorio='artefatos'):
+        self.diretorio = diretorio
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pendentes = []
+
+    def gravar(self, nome, objeto, busca=None):
+        if isinstance(objeto, pd.DataFrame):
+            # copia profunda: a busca segue alterando o DataFrame inplace
+            # enquanto a thread escreve, e uma copia rasa compartilharia os dados
+            objeto = objeto.copy()
+        self.pendentes = [f for f in self.pendentes if not f.done()]
+        self.pendentes.append(self.executor.submit(self.escrever, nome, objeto, busca))
+
+    def escrever(self, nome, objeto, busca=None):
+        diretorio = self.diretorio if busca is None else os.path.join(self.diretorio, busca)
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.join(diretorio, nome)
+        if isinstance(objeto, pd.DataFrame):
+            objeto.to_pickle(caminho + '.pkl')
+        elif hasattr(objeto, 'indptr') and hasattr(objeto, 'itens'):
+            np.savez(caminho + '.npz', indptr=objeto.indptr, itens=objeto.itens)
+        else:
+            with open(caminho + '.pkl', 'wb') as arquivo:
+                pickle.dump(objeto, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def aguardar(self):
+        for futuro in self.pendentes:
+            futuro.result()
+        self.pendentes = []
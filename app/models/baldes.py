@@ -0,0 +1,353 @@
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from time import time
+
+# duracao de cada opcao de 'Temporalidade dos dados' da pagina de parametros
+JANELAS_TEMPO = {
+    'Meses': pd.Timedelta(days=30),
+    'Semanas': pd.Timedelta(weeks=1),
+    'Dias': pd.Timedelta(days=1),
+    'Horas': pd.Timedelta(hours=1),
+    'Minutos': pd.Timedelta(minutes=1),
+}
+
+# teto de k do k-means 1D exato: a programacao dinamica guarda uma matriz de
+# retrocesso de kmax x n inteiros e gasta uma passada O(n log n) por k
+KMAX_EXATO = 200
+MEMORIA_RETROCESSO = 64 * 2**20
+
+
+def _soma_intervalo(x, prefixo, inicio, fim):
+    # soma das distancias de cada ponto x_i aos demais pontos do seu
+    # proprio intervalo [inicio_i, fim_i) do vetor ordenado
+    pos = np.arange(len(x))
+    esquerda = x * (pos - inicio) - (prefixo[pos] - prefixo[inicio])
+    direita = (prefixo[fim] - prefixo[pos + 1]) - x * (fim - pos - 1)
+    return esquerda + direita
+
+
+def janela_em_segundos(janela_tempo):
+    # aceita as opcoes da pagina de parametros ou qualquer texto entendido
+    # por pd.Timedelta (ex.: '2h', '30min')
+    if janela_tempo in JANELAS_TEMPO:
+        return JANELAS_TEMPO[janela_tempo].total_seconds()
+    return pd.Timedelta(janela_tempo).total_seconds()
+
+
+def cortes_por_sessao(timestamps, janela):
+    # posicoes do vetor ordenado onde comeca uma nova sessao, isto e, onde o
+    # intervalo desde o evento anterior excede a janela
+    return np.flatnonzero(np.diff(timestamps) > janela) + 1
+
+
+def baldes_por_sessao(timestamps, janela):
+    # label de sessao de cada evento do vetor ordenado de timestamps
+    labels = np.zeros(len(timestamps), dtype=np.int32)
+    labels[cortes_por_sessao(timestamps, janela)] = 1
+    return np.cumsum(labels, dtype=np.int32)
+
+
+def silhueta_1d(x, labels):
+    # coeficiente de silhueta exato para dados 1D, equivalente a
+    # silhouette_score(|xi - xj|, labels, metric='precomputed'), porem sem
+    # montar a matriz n x n de distancias: memoria O(n) e tempo O(n log n)
+    x = np.asarray(x, dtype=np.float64).ravel()
+    labels = np.asarray(labels).ravel()
+    n = len(x)
+
+    _, labels = np.unique(labels, return_inverse=True)
+    k = labels.max() + 1 if n else 0
+    if not 2 <= k <= n - 1:
+        raise ValueError(f'Numero de labels invalido: {k}. Deve estar entre 2 e n_amostras - 1 (inclusive)')
+
+    # ordena por valor e, em caso de empate, por cluster
+    ordem = np.lexsort((labels, x))
+    x = x[ordem]
+    labels = labels[ordem]
+    prefixo = np.concatenate(([0.0], np.cumsum(x)))
+    tamanhos = np.bincount(labels, minlength=k)
+
+    fronteiras = np.flatnonzero(np.diff(labels)) + 1
+    if len(fronteiras) == k - 1:
+        # caso usual do KMeans 1D: cada cluster e um intervalo contiguo,
+        # logo o cluster vizinho mais proximo e o da esquerda ou o da direita
+        inicios = np.concatenate(([0], fronteiras))
+        fins = np.concatenate((fronteiras, [n]))
+        segmento = np.repeat(np.arange(k), fins - inicios)
+        inicio = inicios[segmento]
+        fim = fins[segmento]
+
+        a = _soma_intervalo(x, prefixo, inicio, fim)
+
+        b = np.full(n, np.inf)
+        tem_esquerda = segmento > 0
+        seg_esq = segmento[tem_esquerda] - 1
+        ini_esq, fim_esq = inicios[seg_esq], fins[seg_esq]
+        b[tem_esquerda] = (x[tem_esquerda] * (fim_esq - ini_esq) - (prefixo[fim_esq] - prefixo[ini_esq])) / (fim_esq - ini_esq)
+
+        tem_direita = segmento < k - 1
+        seg_dir = segmento[tem_direita] + 1
+        ini_dir, fim_dir = inicios[seg_dir], fins[seg_dir]
+        media_dir = ((prefixo[fim_dir] - prefixo[ini_dir]) - x[tem_direita] * (fim_dir - ini_dir)) / (fim_dir - ini_dir)
+        b[tem_direita] = np.minimum(b[tem_direita], media_dir)
+    else:
+        # clusters intercalados: compara cada ponto com todos os clusters,
+        # um cluster por vez (O(k n log n), ainda com memoria O(n))
+        a = np.zeros(n)
+        b = np.full(n, np.inf)
+        for c in range(k):
+            valores = x[labels == c]
+            prefixo_c = np.concatenate(([0.0], np.cumsum(valores)))
+            pos = np.searchsorted(valores, x, side='left')
+            soma = (x * pos - prefixo_c[pos]) + ((prefixo_c[-1] - prefixo_c[pos]) - x * (len(valores) - pos))
+            proprio = labels == c
+            a[proprio] = soma[proprio]
+            b[~proprio] = np.minimum(b[~proprio], soma[~proprio] / len(valores))
+
+    tamanho_proprio = tamanhos[labels]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = a / (tamanho_proprio - 1)
+        s = (b - a) / np.maximum(a, b)
+    # pontos em clusters unitarios tem silhueta 0, como no scikit-learn
+    s[tamanho_proprio == 1] = 0
+    return float(np.mean(np.nan_to_num(s)))
+
+
+def limitar_kmax_exato(kmin, kmax, n):
+    # maior k que o k-means exato avalia para n pontos: o menor entre kmax,
+    # KMAX_EXATO e o que cabe em MEMORIA_RETROCESSO, mas nunca abaixo de kmin
+    return min(kmax, max(kmin, min(KMAX_EXATO, MEMORIA_RETROCESSO // (4 * max(n, 1)))))
+
+
+def kmeans_otimo_1d(x, kmin, kmax):
+    # k-means 1D exato por programacao dinamica (estilo Ckmeans.1d.dp).
+    # Uma unica passada calcula as solucoes otimas de todos os k ate kmax;
+    # o gerador devolve (k, labels) para k em [kmin, kmax], na ordem de x.
+    # Valores repetidos sao agrupados com peso, pois a solucao otima nunca
+    # separa pontos iguais.
+    x = np.asarray(x, dtype=np.float64).ravel()
+    valores, inversa, pesos = np.unique(x, return_inverse=True, return_counts=True)
+    m = len(valores)
+    kmax = min(kmax, m)
+
+    valores = valores - valores.mean()
+    s0 = np.concatenate(([0.0], np.cumsum(pesos)))
+    s1 = np.concatenate(([0.0], np.cumsum(pesos * valores)))
+    s2 = np.concatenate(([0.0], np.cumsum(pesos * valores * valores)))
+
+    def custo(j, i):
+        # soma dos quadrados dos desvios do intervalo [j, i] (inclusivo)
+        soma = s1[i + 1] - s1[j]
+        return np.maximum(s2[i + 1] - s2[j] - soma * soma / (s0[i + 1] - s0[j]), 0.0)
+
+    custo_anterior = custo(np.zeros(m, dtype=np.int64), np.arange(m))
+    # retrocesso[c][i]: inicio do ultimo cluster na solucao com c+1 clusters
+    # cobrindo os valores [0, i]
+    retrocesso = np.zeros((kmax, m), dtype=np.int32)
+
+    for c in range(1, kmax):
+        custo_atual = np.full(m, np.inf)
+        # divisao e conquista sobre i, feita nivel a nivel de forma vetorizada:
+        # o inicio otimo do ultimo cluster e monotono em i, entao cada nivel
+        # da recursao avalia O(m) candidatos no total
+        lo = np.array([c]); hi = np.array([m - 1])
+        opt_lo = np.array([c]); opt_hi = np.array([m - 1])
+        while len(lo):
+            meio = (lo + hi) // 2
+            limite = np.minimum(meio, opt_hi)
+            quantidades = limite - opt_lo + 1
+            deslocamentos = np.concatenate(([0], np.cumsum(quantidades)[:-1]))
+            segmento = np.repeat(np.arange(len(lo)), quantidades)
+            j = opt_lo[segmento] + (np.arange(segmento.size) - deslocamentos[segmento])
+            candidatos = custo_anterior[j - 1] + custo(j, meio[segmento])
+
+            minimos = np.minimum.reduceat(candidatos, deslocamentos)
+            empates = np.flatnonzero(candidatos == minimos[segmento])
+            _, primeiros = np.unique(segmento[empates], return_index=True)
+            melhor_j = j[empates[primeiros]]
+
+            custo_atual[meio] = minimos
+            retrocesso[c, meio] = melhor_j
+
+            esquerda = lo <= meio - 1
+            direita = meio + 1 <= hi
+            lo, hi, opt_lo, opt_hi = (
+                np.concatenate((lo[esquerda], meio[direita] + 1)),
+                np.concatenate((meio[esquerda] - 1, hi[direita])),
+                np.concatenate((opt_lo[esquerda], melhor_j[direita])),
+                np.concatenate((melhor_j[esquerda], opt_hi[direita])),
+            )
+        custo_anterior = custo_atual
+
+    for k in range(max(kmin, 1), kmax + 1):
+        # reconstroi os intervalos da solucao com k clusters
+        rotulos_valores = np.empty(m, dtype=np.int32)
+        fim = m - 1
+        for c in range(k - 1, -1, -1):
+            inicio = retrocesso[c, fim] if c > 0 else 0
+            rotulos_valores[inicio:fim + 1] = c
+            fim = inicio - 1
+        yield k, rotulos_valores[inversa]
+
+
+
+def kmeans_streaming_1d(timestamps, kmin, kmax, tamanho_amostra=20000, tamanho_bloco=100000):
+    # k-means 1D para fluxos grandes e ordenados de timestamps:
+    #  1. k e os centroides iniciais vem do k-means otimo sobre uma amostra
+    #     espacada uniformemente no vetor ordenado;
+    #  2. os centroides sao refinados com MiniBatchKMeans.partial_fit, um
+    #     mini-lote do fluxo por vez;
+    #  3. como os dados e os centroides sao 1D e ordenados, a atribuicao de
+    #     cada bloco e um np.searchsorted contra os pontos medios entre
+    #     centroides vizinhos.
+    # A memoria de trabalho depende apenas da amostra e do tamanho do bloco.
+    # Retorna (labels, historico) com a silhueta de cada k na amostra.
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    n = len(timestamps)
+    amostra = timestamps[np.linspace(0, n - 1, min(n, tamanho_amostra)).astype(np.int64)]
+    kmax = limitar_kmax_exato(kmin, min(kmax, len(amostra) - 1), len(amostra))
+
+    historico = []
+    melhor = None
+    inicio = time()
+    for k, labels_amostra in kmeans_otimo_1d(amostra, kmin, kmax):
+        if len(np.unique(labels_amostra)) < 2:
+            continue
+        sil = silhueta_1d(amostra, labels_amostra)
+        historico.append({'k': k, 'silhueta': sil, 'tempo': time() - inicio})
+        inicio = time()
+        if melhor is None or sil > melhor[1]:
+            melhor = (k, sil, labels_amostra)
+
+    if melhor is None:
+        # kmax < kmin (a janela cobre todos os eventos) ou amostra sem dois
+        # valores distintos: um unico cluster, como no k-means exato
+        return np.zeros(n, dtype=np.int32), historico
+
+    k, _, labels_amostra = melhor
+    centroides = np.array([amostra[labels_amostra == c].mean() for c in range(k)]).reshape(-1, 1)
+    mini_lotes = MiniBatchKMeans(n_clusters=k, init=centroides, n_init=1, random_state=32)
+    # cada mini-lote e uma fatia intercalada (passo num_lotes) do vetor, para
+    # cobrir todo o intervalo de tempo; blocos contiguos de um vetor ordenado
+    # puxariam os centroides para o trecho de cada bloco
+    num_lotes = max(1, -(-n // tamanho_bloco))
+    for lote in range(num_lotes):
+        mini_lotes.partial_fit(timestamps[lote::num_lotes].reshape(-1, 1))
+
+    centroides = np.sort(mini_lotes.cluster_centers_.ravel())
+    pontos_medios = (centroides[1:] + centroides[:-1]) / 2
+    labels = np.empty(n, dtype=np.int32)
+    for primeira in range(0, n, tamanho_bloco):
+        bloco = timestamps[primeira:primeira + tamanho_bloco]
+        labels[primeira:primeira + len(bloco)] = np.searchsorted(pontos_medios, bloco, side='left')
+    return labels, historico
+
+# dados compartilhados com os processos da busca paralela de k; sao
+# enviados uma unica vez, na inicializacao de cada processo
+_X_busca = None
+
+
+def inicializar_busca(X):
+    global _X_busca
+    _X_busca = X
+
+
+def avaliar_kmeans(k):
+    # ajusta o KMeans do scikit-learn para um k e devolve a silhueta 1D,
+    # o tempo gasto e os labels (para reaproveitar o ajuste vencedor)
+    inicio = time()
+    labels = KMeans(n_clusters=k, random_state=32).fit(_X_busca).labels_.astype(np.int32)
+    sil = silhueta_1d(_X_busca, labels)
+    return k, sil, time() - inicio, labels
+
+
+def buscar_melhor_k(avaliar_lote, kmin, kmax, pontos_por_rodada=8, lotes_varredura=4, paciencia=2):
+    # busca do grosso para o fino sobre k, em duas fases:
+    #  1. varredura: uma grade de ate pontos_por_rodada * lotes_varredura
+    #     valores de k igualmente espacados e avaliada em ordem crescente, um
+    #     lote de pontos_por_rodada por vez; a varredura para quando a
+    #     silhueta nao melhora por 'paciencia' lotes seguidos, e os k maiores
+    #     da grade nao sao avaliados;
+    #  2. refino: a grade ao redor do melhor k e refeita com passo 4x menor
+    #     ate o passo chegar a 1, avaliando cada grade inteira.
+    # avaliar_lote recebe uma lista de k e devolve tuplas
+    # (k, silhueta, tempo, labels).
+    # Retorna (labels do melhor k, historico) com uma entrada por k avaliado.
+    historico = {}
+    melhor = None
+
+    def avaliar(ks):
+        nonlocal melhor
+        melhorou = False
+        for k, sil, tempo, labels in avaliar_lote(ks):
+            historico[k] = {'k': k, 'silhueta': sil, 'tempo': tempo}
+            if melhor is None or sil > melhor[1]:
+                melhor = (k, sil, labels)
+                melhorou = True
+        return melhorou
+
+    hi = max(kmin, kmax)
+    passo = max(1, -(-(hi - kmin) // (pontos_por_rodada * lotes_varredura)))
+    grade = list(range(kmin, hi + 1, passo))
+    sem_melhora = 0
+    for i in range(0, len(grade), pontos_por_rodada):
+        sem_melhora = 0 if avaliar(grade[i:i + pontos_por_rodada]) else sem_melhora + 1
+        if sem_melhora >= paciencia:
+            break
+
+    while passo > 1:
+        lo = max(kmin, melhor[0] - passo)
+        hi = min(max(kmin, kmax), melhor[0] + passo)
+        passo = max(1, passo // 4)
+        grade = [k for k in range(lo, hi + 1, passo) if k not in historico]
+        for i in range(0, len(grade), pontos_por_rodada):
+            avaliar(grade[i:i + pontos_por_rodada])
+
+    return melhor[2], [historico[k] for k in sorted(historico)]
+
+
+class baldesCSR:
+    # baldes em formato CSR: os itens (ids inteiros das arestas) de todos os
+    # baldes ficam num unico vetor int32 e o balde b ocupa
+    # itens[indptr[b]:indptr[b + 1]]. As listas de itens so sao montadas
+    # quando um minerador percorre o objeto; 'rotulos' traduz cada id para o
+    # item entregue ao minerador (None entrega os proprios ids).
+    def __init__(self, indptr, itens, rotulos=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.itens = np.asarray(itens, dtype=np.int32)
+        self.rotulos = rotulos
+
+    @classmethod
+    def de_labels(cls, labels, itens, rotulos=None):
+        # agrupa os itens pelo label do cluster com argsort estavel: os
+        # baldes seguem a ordem da primeira ocorrencia de cada label e os
+        # itens mantem a ordem cronologica dentro do balde
+        _, primeiras, inversa = np.unique(labels, return_index=True, return_inverse=True)
+        ordem_baldes = np.empty(len(primeiras), dtype=np.int64)
+        ordem_baldes[np.argsort(primeiras, kind='stable')] = np.arange(len(primeiras))
+        balde = ordem_baldes[inversa]
+        ordem = np.argsort(balde, kind='stable')
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(balde, minlength=len(primeiras)))))
+        return cls(indptr, np.asarray(itens)[ordem], rotulos)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def estatisticas(self):
+        # (numero de baldes, largura media, numero de itens distintos)
+        largura_media = len(self.itens) / len(self) if len(self) else 0.0
+        return len(self), largura_media, len(np.unique(self.itens))
+
+    def balde(self, b):
+        return self.itens[self.indptr[b]:self.indptr[b + 1]]
+
+    def materializar(self, itens):
+        if self.rotulos is None:
+            return itens.tolist()
+        rotulos = self.rotulos
+        return [rotulos[i] for i in itens.tolist()]
+
+    def __iter__(self):
+        for b in range(len(self)):
+            yield self.materializar(self.balde(b))
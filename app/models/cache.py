@@ -0,0 +1,77 @@
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# orcamento padrao de memoria do cache de resultados (bytes)
+MEMORIA_CACHE_PADRAO = 256 * 1024 * 1024
+
+
+def tamanho_em_bytes(objeto):
+    # estimativa do espaco ocupado por um resultado guardado no cache
+    if objeto is None:
+        return 0
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(index=True, deep=True).sum())
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(tamanho_em_bytes(v) for v in objeto.values())
+    if isinstance(objeto, (list, tuple)):
+        # listas longas (dicionario de itens, historico) sao estimadas por amostra
+        amostra = objeto[:100]
+        por_elemento = sum(sys.getsizeof(e) for e in amostra) / len(amostra) if amostra else 0
+        return sys.getsizeof(objeto) + int(por_elemento * len(objeto))
+    # baldes CSR, janelas deslizantes e afins: soma dos arrays que carregam
+    arrays = [v for v in vars(objeto).values() if isinstance(v, np.ndarray)] if hasattr(objeto, '__dict__') else []
+    return sys.getsizeof(objeto) + sum(a.nbytes for a in arrays)
+
+
+class cacheRegras:
+    # cache LRU dos resultados de busca de regras, com orcamento de memoria.
+    # A chave junta o hash do conteudo do dataset e os parametros da busca;
+    # ao estourar o orcamento, os resultados usados ha mais tempo saem
+    # primeiro. Um resultado maior que o orcamento inteiro nao e guardado.
+    def __init__(self, memoria_maxima=MEMORIA_CACHE_PADRAO):
+        self.memoria_maxima = memoria_maxima
+        self.entradas = OrderedDict()
+        self.memoria_usada = 0
+        self.acertos = 0
+        self.falhas = 0
+        # buscas em segundo plano guardam resultados de outra thread
+        self.trava = threading.RLock()
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def obter(self, chave):
+        with self.trava:
+            if chave not in self.entradas:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self.entradas.move_to_end(chave)
+            return self.entradas[chave][0]
+
+    def guardar(self, chave, resultado):
+        tamanho = tamanho_em_bytes(resultado)
+        with self.trava:
+            self.remover(chave)
+            if tamanho > self.memoria_maxima:
+                return
+            self.entradas[chave] = (resultado, tamanho)
+            self.memoria_usada += tamanho
+            while self.memoria_usada > self.memoria_maxima:
+                _, (_, tamanho_antigo) = self.entradas.popitem(last=False)
+                self.memoria_usada -= tamanho_antigo
+
+    def remover(self, chave):
+        with self.trava:
+            if chave in self.entradas:
+                self.memoria_usada -= self.entradas.pop(chave)[1]
+
+    def limpar(self):
+        with self.trava:
+            self.entradas.clear()
+            self.memoria_usada = 0
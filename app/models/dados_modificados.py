@@ -1,3 +1,5 @@
+import hashlib
+import numpy as np
 import pandas as pd
 
 class modifiedData:
@@ -8,7 +10,22 @@ class modifiedData:
         self.destino = destino
         
         #retirando colunas que não serão usadas
-        self.data = self.data[[self.metadata, self.origem, self.destino]]
+        self.data = self.data[[self.metadata, self.origem, self.destino]].copy()
+
+        #hash do conteudo usado (cabecalho + valores), chave do cache de resultados
+        self.hash_conteudo = self.calcular_hash(self.data)
+
+        #codificando origem e destino como inteiros uma única vez:
+        #cada par (origem, destino) vira uma chave int64 e um id denso int32;
+        #valores ausentes ganham um código próprio em vez de -1, que faria a
+        #chave colidir com a de outra aresta
+        cod_origem, self.categorias_origem = pd.factorize(self.data[origem], use_na_sentinel=False)
+        cod_destino, self.categorias_destino = pd.factorize(self.data[destino], use_na_sentinel=False)
+        self.data['cod_origem'] = cod_origem.astype(np.int32)
+        self.data['cod_destino'] = cod_destino.astype(np.int32)
+        self.data['aresta'] = self.chave_aresta(self.data['cod_origem'].to_numpy(), self.data['cod_destino'].to_numpy())
+        id_aresta, self.chaves_arestas = pd.factorize(self.data['aresta'])
+        self.data['id_aresta'] = id_aresta.astype(np.int32)
 
         #colocando os dados em ordem cronológica
         self.data.loc[:, metadata] = pd.to_datetime(self.data[metadata], dayfirst=True)
@@ -17,5 +34,22 @@ class modifiedData:
 
         self.data_ordenado = self.data.copy()
 
+    def calcular_hash(self, data):
+        hash_linhas = pd.util.hash_pandas_object(data, index=False).to_numpy()
+        conteudo = hashlib.sha1(repr(list(data.columns)).encode())
+        conteudo.update(hash_linhas.tobytes())
+        return conteudo.hexdigest()
+
+    def chave_aresta(self, cod_origem, cod_destino):
+        return cod_origem.astype(np.int64) * len(self.categorias_destino) + cod_destino
+
+    def codificar_arestas(self, origens, destinos):
+        #ids densos das arestas (origem, destino); -1 para pares desconhecidos
+        cod_origem = self.categorias_origem.get_indexer(origens)
+        cod_destino = self.categorias_destino.get_indexer(destinos)
+        ids = pd.Index(self.chaves_arestas).get_indexer(self.chave_aresta(cod_origem, cod_destino))
+        ids[(cod_origem < 0) | (cod_destino < 0)] = -1
+        return ids
+
     def getModifiedOrderedData(self):
-        return self.data_ordenado
\ No newline at end of file
+        return self.data_ordenado
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 class originalData:
@@ -13,8 +14,40 @@ class originalData:
         self.orderedData.sort_values(by=metadata, inplace=True)
         self.orderedData.reset_index(inplace=True, drop=True)
 
+        #ordens e colunas em texto usadas pela paginacao, calculadas sob demanda
+        self.ordens = {}
+        self.colunas_texto = {}
+
     def get_data(self):
         return self.data
     
     def getOriginalOrderedData(self):
-        return self.orderedData
\ No newline at end of file
+        return self.orderedData
+
+    def ordem(self, coluna, crescente=True):
+        #posicoes das linhas ordenadas pela coluna (ordenacao estavel)
+        if (coluna, crescente) not in self.ordens:
+            ordenado = self.orderedData[coluna].sort_values(ascending=crescente, kind='stable')
+            self.ordens[(coluna, crescente)] = ordenado.index.to_numpy()
+        return self.ordens[(coluna, crescente)]
+
+    def texto(self, coluna):
+        if coluna not in self.colunas_texto:
+            self.colunas_texto[coluna] = self.orderedData[coluna].astype(str)
+        return self.colunas_texto[coluna]
+
+    def pagina(self, offset=0, limite=100, ordenar=None, crescente=True, filtros=None):
+        #fatia [offset, offset + limite) dos dados ordenados, opcionalmente
+        #reordenados por uma coluna e filtrados por trechos de texto
+        #({coluna: texto}); devolve a fatia e o total de linhas que passam nos filtros
+        indices = None
+        if ordenar is not None:
+            indices = self.ordem(ordenar, crescente)
+        if filtros:
+            mascara = np.ones(len(self.orderedData), dtype=bool)
+            for coluna, texto in filtros.items():
+                mascara &= self.texto(coluna).str.contains(texto, case=False, regex=False).to_numpy()
+            indices = np.flatnonzero(mascara) if indices is None else indices[mascara[indices]]
+        if indices is None:
+            return self.orderedData.iloc[offset:offset + limite], len(self.orderedData)
+        return self.orderedData.iloc[indices[offset:offset + limite]], len(indices)
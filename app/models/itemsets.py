@@ -0,0 +1,116 @@
+import heapq
+import numpy as np
+
+# criterios de ordenacao aceitos pelo modo top-k
+CRITERIOS_TOP_K = ('confianca', 'lift', 'frequencia')
+
+
+def _bitset(indices, tamanho):
+    # inteiro com os bits 'indices' ligados
+    bits = np.zeros(tamanho, dtype=bool)
+    bits[indices] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+class indiceVertical:
+    # indice vertical dos baldes: para cada item, um bitset (inteiro Python)
+    # com os baldes em que ele aparece. O suporte de qualquer itemset e o
+    # numero de bits do E dos bitsets dos seus itens, sem nova passada
+    # pelos baldes.
+    def __init__(self, baldes):
+        ocorrencias = {}
+        num_baldes = 0
+        for b, balde in enumerate(baldes):
+            for item in set(balde):
+                ocorrencias.setdefault(item, []).append(b)
+            num_baldes = b + 1
+        self.num_baldes = num_baldes
+        self.bitsets = {item: _bitset(indices, num_baldes) for item, indices in ocorrencias.items()}
+        self.cache = {}
+
+    def suporte(self, itemset):
+        chave = frozenset(itemset)
+        if chave not in self.cache:
+            bits = -1
+            for item in chave:
+                bits &= self.bitsets.get(item, 0)
+            self.cache[chave] = bits.bit_count() if chave else self.num_baldes
+        return self.cache[chave]
+
+
+def regras_de_itemsets(itemsets, suporte, min_confidence):
+    # gera as regras com um item no consequente a partir de itemsets
+    # (tuplas (itemset, suporte)), no formato devolvido pelo fim com
+    # report='abhC': (consequente, antecedente, FR, FA, FC, Conf em %)
+    regras = []
+    for itemset, fr in itemsets:
+        if len(itemset) < 2:
+            continue
+        for posicao, consequente in enumerate(itemset):
+            antecedente = itemset[:posicao] + itemset[posicao + 1:]
+            fa = suporte(antecedente)
+            conf = 100.0 * fr / fa
+            if conf >= min_confidence:
+                regras.append((consequente, antecedente, fr, fa, suporte((consequente,)), conf))
+    return regras
+
+
+def melhores_regras(itemsets, suporte, min_confidence, k, criterio='confianca', num_baldes=None, redundante=None):
+    # as k melhores regras pelo criterio, sem guardar as demais: um heap de
+    # tamanho k guarda as melhores ate agora e o pior valor dentro dele vira
+    # o limiar efetivo assim que o heap enche. Por frequencia, os itemsets
+    # sao percorridos do maior suporte para o menor e a geracao para quando o
+    # suporte nao supera mais o do heap (o suporte da mineracao tambem sobe,
+    # ver ruleFinder.minerarTopKFrequencia). Por confianca e lift todos os
+    # itemsets frequentes ainda sao minerados; o heap limita so as regras.
+    # O lift usa o numero de baldes.
+    # 'redundante(antecedente, consequente, fa)', quando dado, descarta as
+    # regras redundantes antes de entrarem no heap.
+    if criterio not in CRITERIOS_TOP_K:
+        raise ValueError(f'Criterio de top-k desconhecido: {criterio}')
+    if criterio == 'frequencia':
+        itemsets = sorted(itemsets, key=lambda par: par[1], reverse=True)
+    heap = []
+    ordem = 0
+    for itemset, fr in itemsets:
+        if len(itemset) < 2:
+            continue
+        if criterio == 'frequencia' and len(heap) == k and fr <= heap[0][0]:
+            break
+        for posicao, consequente in enumerate(itemset):
+            antecedente = itemset[:posicao] + itemset[posicao + 1:]
+            fa = suporte(antecedente)
+            conf = 100.0 * fr / fa
+            if conf < min_confidence:
+                continue
+            fc = suporte((consequente,))
+            if criterio == 'confianca':
+                valor = conf
+            elif criterio == 'lift':
+                valor = conf / 100.0 * num_baldes / fc
+            else:
+                valor = fr
+            if len(heap) == k and valor <= heap[0][0]:
+                continue
+            if redundante is not None and redundante(antecedente, consequente, fa):
+                continue
+            # empates ficam com a regra gerada primeiro
+            ordem += 1
+            entrada = (valor, -ordem, (consequente, antecedente, fr, fa, fc, conf))
+            if len(heap) < k:
+                heapq.heappush(heap, entrada)
+            else:
+                heapq.heapreplace(heap, entrada)
+    return [regra for _, _, regra in sorted(heap, reverse=True)]
+
+
+def redundancia_por_fechamento(suporte, itens):
+    # a regra A -> c e redundante (ver poda.py) quando outro item x fora de A
+    # e c aparece em todos os baldes de A: A + x -> c tem as mesmas metricas e
+    # antecedente maior. 'suporte' da o suporte exato de qualquer itemset e
+    # 'itens' sao todos os itens dos baldes, nao so os que o minerador reportou.
+    def redundante(antecedente, consequente, fa):
+        fora = set(antecedente)
+        fora.add(consequente)
+        return any(suporte(antecedente + (x,)) == fa for x in itens if x not in fora)
+    return redundante
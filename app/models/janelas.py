@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class janelasDeslizantes:
+    # transacoes de janelas deslizantes/saltitantes sobre o vetor ordenado de
+    # timestamps: cada janela cobre [inicio, inicio + comprimento) e o inicio
+    # avanca de 'passo' em 'passo'. Com passo < comprimento as janelas se
+    # sobrepoem, captando co-ocorrencias que cruzam a fronteira entre baldes.
+    # As transacoes sao geradas sob demanda, em blocos de limites calculados
+    # com np.searchsorted, entao a memoria nao cresce com o numero de janelas.
+    # O objeto pode ser percorrido varias vezes (uma por minerador). Os itens
+    # sao ids inteiros das arestas; 'rotulos' traduz cada id para o item
+    # entregue ao minerador, como em baldesCSR.
+    # 'origem', 'primeira', 'num_janelas' e 'anterior' descrevem uma fatia das
+    # janelas de outro objeto (ver fatia) e nao precisam ser passados.
+    def __init__(self, timestamps, itens, comprimento, passo, rotulos=None, tamanho_bloco=4096,
+                 origem=None, primeira=0, num_janelas=None, anterior=(-1, -1)):
+        if comprimento <= 0 or passo <= 0:
+            raise ValueError('O comprimento e o passo da janela devem ser positivos')
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.itens = np.asarray(itens, dtype=np.int32)
+        self.rotulos = rotulos
+        self.comprimento = comprimento
+        self.passo = passo
+        self.tamanho_bloco = tamanho_bloco
+        # a janela i comeca em origem + i * passo
+        self.origem = origem if origem is not None else (self.timestamps[0] if len(self.timestamps) else 0.0)
+        self.primeira = primeira
+        # limites (inicio, fim) da ultima janela nao vazia antes da primeira
+        self.anterior = anterior
+        # (numero de transacoes, total de itens), contado uma vez sob demanda
+        self.contagem = None
+
+        if num_janelas is not None:
+            self.num_janelas = num_janelas
+        elif len(self.timestamps):
+            self.num_janelas = int((self.timestamps[-1] - self.timestamps[0]) // passo) + 1
+        else:
+            self.num_janelas = 0
+
+    def limites(self):
+        # gera (inicio, fim) de cada janela nao vazia no vetor de eventos;
+        # janelas seguidas com exatamente os mesmos eventos sao emitidas uma
+        # unica vez, para nao inflar o suporte com transacoes repetidas
+        anterior = self.anterior
+        ultima = self.primeira + self.num_janelas
+        for primeira in range(self.primeira, ultima, self.tamanho_bloco):
+            indices = np.arange(primeira, min(primeira + self.tamanho_bloco, ultima))
+            inicios = self.origem + indices * self.passo
+            lo = np.searchsorted(self.timestamps, inicios, side='left')
+            hi = np.searchsorted(self.timestamps, inicios + self.comprimento, side='left')
+            for inicio, fim in zip(lo.tolist(), hi.tolist()):
+                if fim > inicio and (inicio, fim) != anterior:
+                    anterior = (inicio, fim)
+                    yield inicio, fim
+
+    def fatia(self, inicio, fim):
+        # janelas [inicio, fim) deste objeto como um novo objeto, so com os
+        # eventos que elas cobrem; a janela inicial nao e emitida de novo se
+        # repete a ultima janela nao vazia anterior a ela
+        primeira = self.primeira + inicio
+        ultima = self.primeira + fim
+        lo = int(np.searchsorted(self.timestamps, self.origem + primeira * self.passo, side='left'))
+        hi = int(np.searchsorted(self.timestamps, self.origem + (ultima - 1) * self.passo + self.comprimento, side='left')) if fim > inicio else lo
+        anterior = (-1, -1)
+        if primeira > 0:
+            inicio_anterior = self.origem + (primeira - 1) * self.passo
+            anterior = (int(np.searchsorted(self.timestamps, inicio_anterior, side='left')) - lo,
+                        int(np.searchsorted(self.timestamps, inicio_anterior + self.comprimento, side='left')) - lo)
+        return janelasDeslizantes(self.timestamps[lo:hi], self.itens[lo:hi], self.comprimento, self.passo,
+                                  self.rotulos, self.tamanho_bloco, self.origem, primeira, fim - inicio, anterior)
+
+    def __iter__(self):
+        for inicio, fim in self.limites():
+            itens = self.itens[inicio:fim].tolist()
+            if self.rotulos is None:
+                yield itens
+            else:
+                yield [self.rotulos[i] for i in itens]
+
+    def contar(self):
+        if self.contagem is None:
+            num_janelas = 0
+            total_itens = 0
+            for inicio, fim in self.limites():
+                num_janelas += 1
+                total_itens += fim - inicio
+            self.contagem = (num_janelas, total_itens)
+        return self.contagem
+
+    def estatisticas(self):
+        # (numero de janelas, largura media, numero de itens distintos)
+        num_janelas, total_itens = self.contar()
+        largura_media = total_itens / num_janelas if num_janelas else 0.0
+        return num_janelas, largura_media, len(np.unique(self.itens))
+
+    def __len__(self):
+        return self.contar()[0]
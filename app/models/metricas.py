@@ -0,0 +1,41 @@
+import numpy as np
+
+# metricas de interesse calculadas para cada regra, alem de FR, FA, FC e Conf
+METRICAS = ('Lift', 'Leverage', 'Convicção', 'Jaccard')
+
+
+def calcular_metricas(regras, num_baldes):
+    # Lift, Leverage, Convicção e Jaccard de todas as regras de uma vez, por
+    # operacoes de coluna sobre FR (suporte da regra), FA (do antecedente) e
+    # FC (do consequente), em numero de baldes. A Convicção de uma regra com
+    # confianca 1 e infinita. Altera 'regras' inplace e a devolve.
+    fr = regras['FR'].to_numpy(dtype=np.float64)
+    fa = regras['FA'].to_numpy(dtype=np.float64)
+    fc = regras['FC'].to_numpy(dtype=np.float64)
+    n = float(num_baldes)
+
+    conf = fr / fa
+    suporte_c = fc / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conviccao = np.where(conf < 1.0, (1.0 - suporte_c) / (1.0 - conf), np.inf)
+
+    #truncar conf para 2 casas decimais e as demais metricas para 4
+    regras['Conf'] = np.round(conf * 100.0, 2)
+    regras['Lift'] = np.round(fr * n / (fa * fc), 4)
+    regras['Leverage'] = np.round(fr / n - (fa / n) * suporte_c, 4)
+    regras['Convicção'] = np.round(conviccao, 4)
+    regras['Jaccard'] = np.round(fr / (fa + fc - fr), 4)
+    return regras
+
+
+def filtrar_e_ordenar(regras, ordenar=None, crescente=False, minimos=None):
+    # filtra as regras pelos valores minimos de cada coluna ({coluna: minimo})
+    # com uma unica mascara booleana e ordena pela coluna pedida
+    if minimos:
+        mascara = np.ones(len(regras), dtype=bool)
+        for coluna, minimo in minimos.items():
+            mascara &= regras[coluna].to_numpy() >= minimo
+        regras = regras.loc[mascara]
+    if ordenar is not None:
+        regras = regras.sort_values(ordenar, ascending=crescente, kind='stable')
+    return regras.reset_index(drop=True)
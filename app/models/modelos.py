@@ -1,7 +1,48 @@
 from .dados_originais import originalData
 from .dados_modificados import modifiedData
 from .rulesFinder import ruleFinder
+from .artefatos import ARTEFATOS
+from .cache import cacheRegras
+from .metricas import METRICAS
+from .armazem import armazemResultados
+from .reticulado import reticuladoItemsets
+from .tarefas import gerenciadorTarefas
+import copy
+import hashlib
+import itertools
 import time
+import numpy as np
+import pandas as pd
+
+def gerar_baldes_e_regras(buscador, avisar=None):
+    # etapas da busca de regras sobre um buscador ja configurado; usada na
+    # busca direta e nas tarefas em segundo plano ('avisar' recebe a etapa)
+    if buscador.itemsetsReaproveitaveis():
+        # mesmos baldes da busca anterior: so as regras sao refeitas
+        print('Reaproveitando os baldes da busca anterior')
+    else:
+        if avisar is not None:
+            avisar('gerando baldes')
+        inicio_baldes = time.time()
+        buscador.kmeansBucketGenerator()
+        final_baldes = time.time()
+
+        print('Tempo para gerar baldes: ', final_baldes - inicio_baldes)
+
+    numero_de_baldes = len(buscador.baldes)
+    print('Numero de baldes gerados: ', numero_de_baldes)
+
+    if avisar is not None:
+        avisar('minerando')
+    print('Gerando regras com os parametros: ', buscador.janela_tempo, buscador.min_repetition, buscador.min_confidence )
+    return buscador.assoctiationRulesFinder()
+
+
+def buscar_regras_em_processo(buscador, progresso, id_tarefa):
+    # executada no pool de processos; devolve o estado para o cache do modelo
+    gerar_baldes_e_regras(buscador, lambda etapa: progresso.__setitem__(id_tarefa, etapa))
+    return buscador.estado()
+
 
 class Modelo:
     def __init__(self):
@@ -9,111 +50,174 @@ class Modelo:
         self.dados_modificados = None
         self.buscador_regras = None
         self.regras = None
+        self.reticulado = None
+        # paginas de filhos ja servidas da arvore atual: (no, offset, limite) -> pagina
+        self.cache_arvore = {}
+        # destaque das regras nos dados originais: id da aresta de cada linha,
+        # mascara das arestas de todas as regras e a da regra escolhida
+        self.ids_arestas_originais = None
+        self.mascara_regras = None
+        self.mascara_regra_escolhida = None
+        # gravador de artefatos intermediarios; None (padrao) nao grava nada
+        self.gravador_artefatos = None
+        self.artefatos_persistidos = ARTEFATOS
+        # resultados de buscas anteriores, por conteudo do dataset + parametros
+        self.cache_regras = cacheRegras()
+        # copia em disco dos resultados, lida sob demanda depois de um reinicio;
+        # None desliga
+        self.armazem = armazemResultados()
+        # particoes da mineracao paralela; None deixa o ruleFinder decidir
+        self.particoes_mineracao = None
+        # buscas em segundo plano e a chave (hash + parametros) de cada uma
+        self.tarefas = gerenciadorTarefas()
+        self.chaves_tarefas = {}
+
+    def set_memoria_cache(self, memoria_maxima):
+        self.cache_regras = cacheRegras(memoria_maxima)
+
+    def set_particoes_mineracao(self, particoes):
+        self.particoes_mineracao = particoes
+
+    def set_armazem(self, armazem):
+        self.armazem = armazem
+
+    def set_gravador_artefatos(self, gravador, artefatos=ARTEFATOS):
+        self.gravador_artefatos = gravador
+        self.artefatos_persistidos = tuple(artefatos)
 
     def set_dados_originais(self, data, metadata, origem, destino):
         self.dados_originais = originalData(data, metadata, origem, destino)
+        self.limpar_destaques()
 
     def set_dados_modificados(self, data, metadata, origem, destino):
         self.dados_modificados = modifiedData(data, metadata, origem, destino)
+        self.limpar_destaques()
+
+    def limpar_destaques(self):
+        self.ids_arestas_originais = None
+        self.mascara_regras = None
+        self.mascara_regra_escolhida = None
 
 
-    def set_regras_parametros(self, min_repetition, min_confidence , janela_tempo):
+    def set_regras_parametros(self, min_repetition, min_confidence , janela_tempo, modo_baldes='kmeans', comprimento_janela=None, passo_janela=None, motor='auto', alvo='regras', top_k=None, criterio_top_k='confianca'):
         if self.buscador_regras is None:
-            self.buscador_regras = ruleFinder(janela_tempo, min_repetition, min_confidence )
+            self.buscador_regras = ruleFinder(janela_tempo, min_repetition, min_confidence, modo_baldes, motor, alvo)
         else:
             self.buscador_regras.set_infos_regras(janela_tempo, min_repetition, min_confidence )
+            self.buscador_regras.set_modo_baldes(modo_baldes)
+            self.buscador_regras.set_motor(motor)
+            self.buscador_regras.set_alvo(alvo)
+        self.buscador_regras.set_janela_deslizante(comprimento_janela, passo_janela)
+        self.buscador_regras.set_top_k(top_k, criterio_top_k)
 
-    def buscar_regras(self):
-        self.buscador_regras.set_dataset(self.dados_modificados.getModifiedOrderedData())
+    def preparar_busca(self, persistir=None):
+        # passa os dados ao buscador e devolve a chave da busca (hash + parametros)
+        # persistir: artefatos gravados nesta busca (padrao: os do gravador configurado)
+        self.buscador_regras.set_dataset(self.dados_modificados.getModifiedOrderedData(), self.dados_modificados.hash_conteudo)
         self.buscador_regras.set_infos_dados(self.dados_modificados.metadata, self.dados_modificados.origem, self.dados_modificados.destino)
-        inicio_baldes = time.time()
-        self.buscador_regras.kmeansBucketGenerator()
-        final_baldes = time.time()
+        chave = (self.dados_modificados.hash_conteudo,) + self.buscador_regras.parametros()
+        # os artefatos de cada busca vao para um subdiretorio com o hash da chave
+        self.buscador_regras.set_gravador(self.gravador_artefatos, self.artefatos_persistidos if persistir is None else persistir,
+                                          hashlib.sha1(repr(chave).encode()).hexdigest())
+        self.buscador_regras.set_particoes(self.particoes_mineracao)
+        return chave
 
-        print('Tempo para gerar baldes: ', final_baldes - inicio_baldes)
+    def recuperar_resultado(self, chave):
+        estado = self.cache_regras.obter(chave)
+        if estado is None and self.armazem is not None:
+            estado = self.armazem.carregar(chave)
+            if estado is not None:
+                print('Regras carregadas do disco')
+                self.cache_regras.guardar(chave, estado)
+        return estado
+
+    def guardar_resultado(self, chave, estado):
+        self.cache_regras.guardar(chave, estado)
+        if self.armazem is not None:
+            self.armazem.salvar(chave, estado)
 
-        numero_de_baldes = len(self.buscador_regras.baldes)
-        print('Numero de baldes gerados: ', numero_de_baldes)
+    def buscar_regras(self, persistir=None):
+        chave = self.preparar_busca(persistir)
+        estado = self.recuperar_resultado(chave)
+        if estado is not None:
+            print('Regras recuperadas do cache')
+            # copia: as rotas alteram o resultado inplace
+            self.regras = self.buscador_regras.restaurar(estado)
+            return self.regras
 
-        print('Gerando regras com os parametros: ', self.buscador_regras.janela_tempo, self.buscador_regras.min_repetition, self.buscador_regras.min_confidence )
-        self.regras = self.buscador_regras.assoctiationRulesFinder()
+        self.regras = gerar_baldes_e_regras(self.buscador_regras)
+        self.guardar_resultado(chave, self.buscador_regras.estado())
         return self.regras
+
+    def submeter_busca_regras(self):
+        # busca em segundo plano: devolve o id da tarefa; o resultado vai para
+        # o cache (e o disco) assim que termina, e as paginas o leem de la
+        chave = self.preparar_busca()
+        if self.recuperar_resultado(chave) is not None:
+            id_tarefa = self.tarefas.concluida()
+        else:
+            # o processo recebe uma copia do buscador, sem o gravador (que tem uma thread)
+            buscador = copy.copy(self.buscador_regras)
+            buscador.set_gravador(None, ())
+            id_tarefa = self.tarefas.submeter(buscar_regras_em_processo, buscador,
+                                              ao_concluir=lambda estado: self.guardar_resultado(chave, estado))
+        self.chaves_tarefas[id_tarefa] = chave
+        return id_tarefa
+
+    def get_status_busca(self, id_tarefa):
+        return self.tarefas.status(id_tarefa)
+
+    def get_resultado_busca(self, id_tarefa):
+        # regras de uma tarefa concluida; se os parametros atuais sao os da
+        # tarefa, o resultado passa a ser o do modelo, como numa busca direta
+        chave = self.chaves_tarefas[id_tarefa]
+        estado = self.recuperar_resultado(chave)
+        if estado is None:
+            return None
+        if self.buscador_regras is not None and self.dados_modificados is not None and chave == self.preparar_busca():
+            self.regras = self.buscador_regras.restaurar(estado)
+            return self.regras
+        return self.buscador_regras.decodificarRegras(estado['regras'], estado['rotulos'])
     
     def get_itemsets(self):
         if self.regras is None:
-            return None
+            return None, None
         
-        itemsets = self.regras.copy()
-
-        padroes = []
-        for index, row in itemsets.iterrows():
-            padroes.append(row['Antecedente'] + (row['Consequente'],))
-
-        itemsets['Padrão'] = padroes
-        itemsets.drop(columns=['Antecedente', 'Consequente', 'Conf'], inplace=True)
+        itemsets = self.regras.rename(columns={'FR': 'Frequência'})
 
-        #remover duplicatas e permutações entre os elementos
-        padroes_sem_duplicatas = []
-        indices_para_remover = []
-        for index, row in itemsets.iterrows():
-            if tuple(sorted(row['Padrão'])) not in padroes_sem_duplicatas:
-                padroes_sem_duplicatas.append(tuple(sorted(row['Padrão'])))
-            else:
-                indices_para_remover.append(index)
-        itemsets.drop(indices_para_remover, inplace=True)
-        itemsets.reset_index(drop=True, inplace=True)
-        itemsets.apply(lambda x: tuple(sorted(x['Padrão'])), axis=1)
-
-        padroes_arvore = []
-        for index, row in itemsets.iterrows():
-            padroes_arvore.append((list(row['Padrão']), row['Frequência']))
+        itemsets['Padrão'] = [antecedente + (consequente,) for antecedente, consequente
+                              in zip(itemsets['Antecedente'].tolist(), itemsets['Consequente'].tolist())]
+        itemsets.drop(columns=['Antecedente', 'Consequente', 'Conf', 'FA', 'FC'] + list(METRICAS), inplace=True, errors='ignore')
 
+        #remover duplicatas e permutações entre os elementos: a chave canonica
+        #de cada padrao e o conjunto dos seus itens
+        chaves = pd.Series([frozenset(padrao) for padrao in itemsets['Padrão'].tolist()], index=itemsets.index)
+        itemsets = itemsets.loc[~chaves.duplicated()].reset_index(drop=True)
 
         self.itemsets = itemsets
-        self.itemsets_tree_view = None
+        padroes_arvore = list(zip(itemsets['Padrão'].tolist(), itemsets['Frequência'].tolist()))
+        self.itemsets_tree_view = self.gerar_arvore_dos_itemsets(padroes_arvore) if padroes_arvore else None
 
         return self.itemsets, self.itemsets_tree_view
     
     def gerar_arvore_dos_itemsets(self, lista_tuplas):
-        # Função para encontrar os conjuntos com o maior número de elementos distintos
-        def encontrar_nos_pais(lista_tuplas):
-            conjuntos_info = [(set(tupla), info_adicional) for tupla, info_adicional in lista_tuplas]
-            max_tamanho = max(len(conjunto) for conjunto, _ in conjuntos_info)
-            return [(list(tupla), info_adicional) for tupla, info_adicional in lista_tuplas if len(set(tupla)) == max_tamanho]
-
-        # Função para encontrar os subconjuntos de um conjunto
-        def subconjuntos(conjunto):
-            subconjuntos = [[]]
-            for elemento in conjunto:
-                subconjuntos.extend([subset + [elemento] for subset in subconjuntos])
-            return subconjuntos[1:]  # Remova o conjunto vazio
-
-        # Encontre os nós pais
-        nos_pais = encontrar_nos_pais(lista_tuplas)
-
-        # Construa a árvore
-        arvore = []
-        for no_pai, info_pai in nos_pais:
-            subconjuntos_pai = subconjuntos(set(no_pai))
-            no_pai_e_filhos = [(no_pai, info_pai)]
-            for subconjunto in subconjuntos_pai:
-                if list(subconjunto) in [tupla for tupla, _ in lista_tuplas]:
-                    info_filho = [info for tupla, info in lista_tuplas if list(tupla) == list(subconjunto)][0]
-                    no_pai_e_filhos.append((list(subconjunto), info_filho))
-            arvore.append(no_pai_e_filhos)
-
-       # Função para imprimir a árvore de forma recursiva
-        def imprimir_arvore(arvore, nivel=0):
-            if arvore is None:
-                return
-            for no_pai_e_filhos in arvore:
-                print("  " * nivel + str(no_pai_e_filhos[0]))
-                for filho, info_filho in no_pai_e_filhos[1:]:
-                    print("  " * (nivel + 1) + str(filho) + " - " + info_filho)
-
-        # Imprimir a árvore
-        imprimir_arvore(arvore)
-        return arvore
+        # diagrama de Hasse dos itemsets (ver reticulado.py): as raizes sao os
+        # itemsets sem superconjunto e cada no aponta para os seus
+        # subconjuntos maximais
+        inicio = time.time()
+        self.reticulado = reticuladoItemsets(lista_tuplas)
+        self.cache_arvore = {}
+        print('Tempo para gerar a arvore dos itemsets: ', time.time() - inicio)
+        print('Nos na arvore: ', len(self.reticulado), ' raizes: ', len(self.reticulado.raizes))
+        return self.reticulado
+
+    def get_filhos_arvore(self, no=None, offset=0, limite=100):
+        if self.reticulado is None:
+            return None
+        chave = (no, offset, limite)
+        if chave not in self.cache_arvore:
+            self.cache_arvore[chave] = self.reticulado.pagina_filhos(no, offset, limite)
+        return self.cache_arvore[chave]
 
     def get_regras(self):
         if self.regras is None:
@@ -123,6 +227,53 @@ class Modelo:
     
     def get_dados_originais_ordenado(self):
         return self.dados_originais.getOriginalOrderedData()
+
+    def get_ids_arestas_originais(self):
+        # id inteiro da aresta (origem, destino) de cada linha dos dados
+        # originais ordenados, no mesmo dicionario usado na mineracao
+        if self.ids_arestas_originais is None:
+            dados = self.dados_originais.getOriginalOrderedData()
+            self.ids_arestas_originais = self.dados_modificados.codificar_arestas(
+                dados[self.dados_originais.origem], dados[self.dados_originais.destino])
+        return self.ids_arestas_originais
+
+    def mascara_destaque(self, pares=None):
+        # linhas dos dados originais ordenados cujas arestas aparecem nas
+        # regras (pares=None) ou na lista de pares (origem, destino) dada,
+        # num unico teste de pertinencia sobre os ids inteiros das arestas
+        if pares is None:
+            regras = self.buscador_regras.regras_codificadas
+            if self.mascara_regras is not None and self.mascara_regras[0] is regras:
+                return self.mascara_regras[1]
+            ids = np.concatenate([np.fromiter(itertools.chain.from_iterable(regras['Antecedente'].tolist()), dtype=np.int64),
+                                  regras['Consequente'].to_numpy(dtype=np.int64)])
+            mascara = np.isin(self.get_ids_arestas_originais(), ids)
+            self.mascara_regras = (regras, mascara)
+            return mascara
+        pares = list(pares)
+        if not pares:
+            return np.zeros(len(self.get_ids_arestas_originais()), dtype=bool)
+        origens, destinos = zip(*pares)
+        ids = self.dados_modificados.codificar_arestas(list(origens), list(destinos))
+        return np.isin(self.get_ids_arestas_originais(), ids[ids >= 0])
+
+    def set_regra_escolhida(self, pares):
+        self.mascara_regra_escolhida = self.mascara_destaque(pares)
+
+    def get_pagina_dados_originais(self, offset=0, limite=100, ordenar=None, crescente=True, filtros=None):
+        if self.dados_originais is None:
+            return None, 0
+        return self.dados_originais.pagina(offset, limite, ordenar, crescente, filtros)
     
     def get_dados_com_cluster(self):
-        return self.buscador_regras.dados_com_cluster
\ No newline at end of file
+        return self.buscador_regras.dados_com_cluster
+
+    def get_tempos_motores(self):
+        if self.buscador_regras is None:
+            return {}
+        return self.buscador_regras.tempos_motores
+
+    def get_historico_k(self):
+        if self.buscador_regras is None:
+            return []
+        return self.buscador_regras.historico_k
\ No newline at end of file
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def _bitsets_maior_ou_igual(valores):
+    # para cada valor distinto v, bitset das regras com valor >= v
+    ordem = np.argsort(-valores, kind='stable')
+    bitsets = {}
+    acumulado = 0
+    for posicao, regra in enumerate(ordem.tolist()):
+        acumulado |= 1 << regra
+        if posicao + 1 == len(ordem) or valores[ordem[posicao + 1]] != valores[regra]:
+            bitsets[valores[regra]] = acumulado
+    return bitsets
+
+
+def mascara_regras_redundantes(regras):
+    # Marca as regras dominadas: existe outra regra com o mesmo consequente,
+    # antecedente que contem o seu e FR, FA, FC e Conf iguais ou maiores.
+    # Em vez de comparar todos os pares de regras, cada grupo de mesmo
+    # consequente ganha um indice invertido item -> bitset das regras cujo
+    # antecedente contem o item; o E dos bitsets dos itens de um antecedente
+    # da todas as regras que o contem. Bitsets de "metrica >= valor" para FR,
+    # FA e FC restringem os candidatos antes da comparacao final da Conf,
+    # feita de forma vetorizada.
+    redundantes = np.zeros(len(regras), dtype=bool)
+    if len(regras) == 0:
+        return redundantes
+
+    antecedentes = regras['Antecedente'].tolist()
+    fr = regras['FR'].to_numpy()
+    fa = regras['FA'].to_numpy()
+    fc = regras['FC'].to_numpy()
+    conf = regras['Conf'].to_numpy()
+
+    grupos = {}
+    for posicao, consequente in enumerate(regras['Consequente'].tolist()):
+        grupos.setdefault(consequente, []).append(posicao)
+
+    for posicoes in grupos.values():
+        if len(posicoes) < 2:
+            continue
+        posicoes = np.array(posicoes)
+
+        indice_itens = {}
+        for local, posicao in enumerate(posicoes.tolist()):
+            bit = 1 << local
+            for item in set(antecedentes[posicao]):
+                indice_itens[item] = indice_itens.get(item, 0) | bit
+
+        fr_local, fa_local, fc_local = fr[posicoes], fa[posicoes], fc[posicoes]
+        fr_ge = _bitsets_maior_ou_igual(fr_local)
+        fa_ge = _bitsets_maior_ou_igual(fa_local)
+        fc_ge = _bitsets_maior_ou_igual(fc_local)
+        conf_local = conf[posicoes]
+
+        for local, posicao in enumerate(posicoes.tolist()):
+            candidatos = fr_ge[fr_local[local]] & fa_ge[fa_local[local]] & fc_ge[fc_local[local]]
+            for item in set(antecedentes[posicao]):
+                candidatos &= indice_itens[item]
+                if not candidatos:
+                    break
+            candidatos &= ~(1 << local)
+            if not candidatos:
+                continue
+            bits = np.unpackbits(np.frombuffer(candidatos.to_bytes((candidatos.bit_length() + 7) // 8, 'little'), dtype=np.uint8), bitorder='little')
+            indices = np.flatnonzero(bits)
+            if (conf_local[indices] >= conf_local[local]).any():
+                redundantes[posicao] = True
+
+    return redundantes
@@ -0,0 +1,74 @@
+class reticuladoItemsets:
+    # Diagrama de Hasse de uma colecao de itemsets: cada itemset aponta para
+    # os seus subconjuntos maximais presentes na colecao (os filhos imediatos
+    # no reticulado), e as raizes sao os itemsets sem superconjunto presente.
+    # Cada itemset tem uma chave canonica (codigos inteiros dos itens em
+    # ordem crescente) guardada numa arvore de prefixos; os subconjuntos
+    # presentes de um itemset saem de uma busca nessa arvore que so segue
+    # itens do proprio itemset, sem enumerar as 2^n partes.
+    def __init__(self, lista_tuplas):
+        codigos = {}
+        self.nos = []
+        self.indice = {}
+        # arvore de prefixos: cada no e [filhos por codigo, id do itemset ou None]
+        self.prefixos = [{}, None]
+        for itens, info in lista_tuplas:
+            chave = tuple(sorted({codigos.setdefault(item, len(codigos)) for item in itens}))
+            if chave in self.indice:
+                continue
+            self.indice[chave] = len(self.nos)
+            self.nos.append((list(itens), info))
+            no = self.prefixos
+            for codigo in chave:
+                no = no[0].setdefault(codigo, [{}, None])
+            no[1] = self.indice[chave]
+        self.chaves = list(self.indice)
+
+        self.filhos = [self.subconjuntos_maximais(chave) for chave in self.chaves]
+        tem_pai = [False] * len(self.nos)
+        for filhos in self.filhos:
+            for filho in filhos:
+                tem_pai[filho] = True
+        self.raizes = [no for no in range(len(self.nos)) if not tem_pai[no]]
+
+    def __len__(self):
+        return len(self.nos)
+
+    def subconjuntos_presentes(self, chave):
+        # ids dos itemsets da colecao contidos propriamente em 'chave'
+        encontrados = []
+        pilha = [(self.prefixos, 0)]
+        while pilha:
+            no, posicao = pilha.pop()
+            for proxima in range(posicao, len(chave)):
+                filho = no[0].get(chave[proxima])
+                if filho is None:
+                    continue
+                if filho[1] is not None:
+                    encontrados.append(filho[1])
+                pilha.append((filho, proxima + 1))
+        proprio = self.indice[chave]
+        return [no for no in encontrados if no != proprio]
+
+    def subconjuntos_maximais(self, chave):
+        # entre os subconjuntos presentes, os que nao estao contidos em outro
+        subconjuntos = sorted(self.subconjuntos_presentes(chave), key=lambda no: -len(self.chaves[no]))
+        maximais = []
+        for no in subconjuntos:
+            conjunto = set(self.chaves[no])
+            if not any(conjunto < set(self.chaves[m]) for m in maximais):
+                maximais.append(no)
+        return maximais
+
+    def no(self, no):
+        itens, info = self.nos[no]
+        return {'id': no, 'itens': itens, 'info': info, 'num_filhos': len(self.filhos[no])}
+
+    def pagina_filhos(self, no=None, offset=0, limite=100):
+        # uma pagina dos filhos de 'no' (None: das raizes), para a arvore
+        # carregada sob demanda
+        if no is not None and not 0 <= no < len(self.nos):
+            raise IndexError(f'No inexistente: {no}')
+        ids = self.raizes if no is None else self.filhos[no]
+        return {'no': no, 'offset': offset, 'limite': limite, 'total': len(ids),
+                'nos': [self.no(filho) for filho in ids[offset:offset + limite]]}
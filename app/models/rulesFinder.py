@@ -1,28 +1,90 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score, silhouette_samples
 from sklearn.preprocessing import StandardScaler
 from math import sqrt, floor
 from tqdm import tqdm
 import fim
+import os
 from time import time
+from concurrent.futures import ProcessPoolExecutor
+from .baldes import (silhueta_1d, kmeans_otimo_1d, limitar_kmax_exato, buscar_melhor_k, avaliar_kmeans, inicializar_busca,
+                     janela_em_segundos, cortes_por_sessao, baldes_por_sessao, baldesCSR,
+                     kmeans_streaming_1d)
+from .janelas import janelasDeslizantes
+from .poda import mascara_regras_redundantes
+from .metricas import calcular_metricas
+from .son import minerar_particionado, filtrar_condensados, com_transacao_vazia, MIN_BALDES_PARTICIONADO
+from .itemsets import (indiceVertical, regras_de_itemsets, melhores_regras, redundancia_por_fechamento,
+                       CRITERIOS_TOP_K)
+
+# modos de geracao de baldes aceitos por ruleFinder.set_modo_baldes
+MODOS_BALDES = ('kmeans', 'kmeans_otimo', 'streaming', 'sessao', 'janela_deslizante')
+# mineradores aceitos por ruleFinder.set_motor; 'auto' escolhe pelo formato
+# dos baldes e 'benchmark' roda e cronometra os quatro
+MOTORES = ('auto', 'arules', 'fpgrowth', 'eclat', 'apriori', 'benchmark')
+# o que o minerador procura: todas as regras, ou itemsets fechados/maximais,
+# dos quais sai um conjunto condensado de regras (sem regras redundantes)
+ALVOS = {'regras': 'r', 'fechados': 'c', 'maximais': 'm'}
+
+
+def escolher_motor(num_baldes, largura_media, num_itens):
+    # Eclat intersecta listas de baldes por item: compensa quando ha poucos
+    # baldes ou quando os dados sao densos (baldes largos em relacao ao
+    # numero de itens distintos). Com muitos baldes esparsos o FP-growth,
+    # que comprime prefixos comuns numa arvore, tende a ser mais rapido.
+    densidade = largura_media / max(num_itens, 1)
+    if num_baldes <= 10000 or densidade >= 0.05:
+        return 'eclat'
+    return 'fpgrowth'
 
 class ruleFinder:
-    def __init__(self, janela_tempo, min_repetition, min_confidence ):
+    def __init__(self, janela_tempo, min_repetition, min_confidence, modo_baldes='kmeans', motor='auto', alvo='regras'):
         self.dataset = None
         self.metadata = None
         self.origem = None
         self.destino = None
         self.dados_com_cluster = None
         self.baldes = []
+        # dicionario de itens: o id inteiro de cada aresta indexa o par
+        # (origem, destino); os mineradores trabalham so com os ids
+        self.rotulos = []
+        # regras da ultima busca ainda com os ids inteiros das arestas
+        self.regras_codificadas = None
+        # itemsets frequentes (ids, suporte) da ultima mineracao, o suporte
+        # minimo usado e a assinatura dos baldes/alvo de onde sairam
+        self.hash_conteudo = None
+        self.itemsets = None
+        self.min_rep_itemsets = None
+        self.assinatura_itemsets = None
+        # silhueta e tempo de cada k avaliado na ultima geracao de baldes
+        self.historico_k = []
         self.janela_tempo = janela_tempo
         self.min_repetition = min_repetition
         self.min_confidence  = min_confidence 
+        self.set_modo_baldes(modo_baldes)
+        self.set_motor(motor)
+        self.set_alvo(alvo)
+        # modo top-k: so as k melhores regras pelo criterio (None desliga)
+        self.set_top_k(None)
+        # numero de particoes da mineracao paralela (SON); None decide pelo
+        # numero de baldes e de CPUs, 1 desliga
+        self.particoes = None
+        # tempo de mineracao de cada motor executado na ultima busca
+        self.tempos_motores = {}
+        # comprimento e passo das janelas deslizantes (modo 'janela_deslizante');
+        # None usa a janela de tempo e metade dela, respectivamente
+        self.comprimento_janela = None
+        self.passo_janela = None
+        # gravador opcional dos artefatos intermediarios (desligado por padrao)
+        self.gravador = None
+        self.artefatos_persistidos = set()
+        # nome da busca atual para o gravador (subdiretorio dos artefatos)
+        self.busca = None
        
-    def set_dataset(self, dataset):
+    def set_dataset(self, dataset, hash_conteudo=None):
         self.dataset = dataset
+        self.hash_conteudo = hash_conteudo
 
     def set_infos_dados(self, metadata, origem, destino):
         self.metadata = metadata
@@ -34,6 +96,99 @@ class ruleFinder:
         self.min_repetition = min_repetition
         self.min_confidence  = min_confidence 
 
+    def set_modo_baldes(self, modo_baldes):
+        if modo_baldes not in MODOS_BALDES:
+            raise ValueError(f'Modo de baldes desconhecido: {modo_baldes}')
+        self.modo_baldes = modo_baldes
+
+    def set_motor(self, motor):
+        if motor not in MOTORES:
+            raise ValueError(f'Motor de mineracao desconhecido: {motor}')
+        self.motor = motor
+
+    def parametros(self):
+        # tudo que muda o resultado da busca, usado na chave do cache
+        return (self.metadata, self.origem, self.destino, self.janela_tempo, str(self.min_repetition),
+                float(self.min_confidence), self.modo_baldes, self.comprimento_janela, self.passo_janela,
+                self.motor, self.alvo, self.top_k, self.criterio_top_k)
+
+    def estado(self):
+        # resultado da ultima busca, no formato guardado pelo cache
+        return {'regras': self.regras_codificadas, 'rotulos': self.rotulos, 'baldes': self.baldes,
+                'dados_com_cluster': self.dados_com_cluster, 'historico_k': self.historico_k,
+                'tempos_motores': self.tempos_motores, 'itemsets': self.itemsets,
+                'min_rep_itemsets': self.min_rep_itemsets, 'assinatura_itemsets': self.assinatura_itemsets}
+
+    def restaurar(self, estado):
+        self.regras_codificadas = estado['regras']
+        self.rotulos = estado['rotulos']
+        self.baldes = estado['baldes']
+        self.dados_com_cluster = estado['dados_com_cluster']
+        self.historico_k = estado['historico_k']
+        self.tempos_motores = estado['tempos_motores']
+        self.itemsets = estado['itemsets']
+        self.min_rep_itemsets = estado['min_rep_itemsets']
+        self.assinatura_itemsets = estado['assinatura_itemsets']
+        return self.decodificarRegras(self.regras_codificadas)
+
+    def assinaturaItemsets(self):
+        # tudo que muda os itemsets minerados, exceto o suporte minimo
+        return (self.hash_conteudo, self.metadata, self.origem, self.destino, self.janela_tempo,
+                self.modo_baldes, self.comprimento_janela, self.passo_janela, self.alvo)
+
+    def itemsetsReaproveitaveis(self):
+        # os itemsets da ultima busca servem se os baldes e o alvo sao os mesmos
+        # e o suporte minimo nao baixou: a confianca so filtra regras derivadas
+        # deles. Itemsets maximais dependem do suporte, entao ali ele tem que
+        # ser o mesmo. O benchmark sempre minera, para cronometrar os motores.
+        if self.itemsets is None or self.hash_conteudo is None or self.motor == 'benchmark':
+            return False
+        if self.assinatura_itemsets != self.assinaturaItemsets():
+            return False
+        if self.alvo == 'maximais':
+            return int(self.min_repetition) == self.min_rep_itemsets
+        return int(self.min_repetition) >= self.min_rep_itemsets
+
+    def set_alvo(self, alvo):
+        if alvo not in ALVOS:
+            raise ValueError(f'Alvo de mineracao desconhecido: {alvo}')
+        self.alvo = alvo
+
+    def set_top_k(self, k, criterio='confianca'):
+        if criterio not in CRITERIOS_TOP_K:
+            raise ValueError(f'Criterio de top-k desconhecido: {criterio}')
+        if k is not None and int(k) < 1:
+            raise ValueError('O top-k precisa de k >= 1')
+        self.top_k = None if k is None else int(k)
+        self.criterio_top_k = criterio
+
+    def set_particoes(self, particoes):
+        if particoes is not None and int(particoes) < 1:
+            raise ValueError('O numero de particoes precisa ser >= 1')
+        self.particoes = None if particoes is None else int(particoes)
+
+    def numeroParticoes(self, num_baldes):
+        # o suporte local ceil(s * n_i / N) so fica >= 2 com menos particoes
+        # que o suporte minimo s (ver minerar_particionado)
+        if self.particoes is not None:
+            return min(self.particoes, max(num_baldes, 1))
+        if num_baldes < MIN_BALDES_PARTICIONADO:
+            return 1
+        return max(1, min(os.cpu_count() or 1, int(self.min_repetition) - 1))
+
+    def set_gravador(self, gravador, artefatos, busca=None):
+        self.gravador = gravador
+        self.artefatos_persistidos = set(artefatos)
+        self.busca = busca
+
+    def persistir(self, nome, objeto):
+        if self.gravador is not None and nome in self.artefatos_persistidos:
+            self.gravador.gravar(nome, objeto, self.busca)
+
+    def set_janela_deslizante(self, comprimento, passo):
+        self.comprimento_janela = comprimento
+        self.passo_janela = passo
+
     def kmeansBucketGenerator(self):
         # https://pandas.pydata.org/docs/reference/api/pandas.DataFrame.values.html
         # https://scikit-learn.org/stable/modules/preprocessing.html
@@ -50,65 +205,67 @@ class ruleFinder:
         dataset.reset_index(inplace=True, drop=True)
 
 
-        # contar o numero de vezes que cada item (coluna 0, coluna 1) aparece
-        contagem_ocorrencias = dataset.groupby([origem, destino]).size()
-        dataset['contagem_ocorrencias'] = dataset.apply(lambda row: contagem_ocorrencias[(row[origem], row[destino])], axis=1)
+        # contar o numero de vezes que cada item (coluna 0, coluna 1) aparece,
+        # usando o id inteiro de cada par (origem, destino) gerado na carga dos dados
+        id_aresta = dataset['id_aresta'].to_numpy()
+        dataset['contagem_ocorrencias'] = np.bincount(id_aresta)[id_aresta]
         # #remove linhas com ocorrencias menores que 2
         dataset = dataset.loc[dataset['contagem_ocorrencias'] >= 2]
         dataset.reset_index(inplace=True, drop=True)
 
-        # Selecionar características relevantes, neste caso, a coluna 'timestamp_seconds' e o numero de vezes que cada item aparece
-        # X = dataset[['timestamp_seconds', 'contagem_ocorrencias']].values
-        X = dataset[['timestamp_seconds']].values
-     
-        # Normalização dos dados
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-
-        # calcular a matriz de distancias
-        # se trata da norma L2, mas como temos um dado 1D,
-        # temos que a norma é equivalente ao valor absoluto de cada elemento 
-        # da única componente
-        Xi, Xj = np.meshgrid(X_scaled, X_scaled)
-        distancias = np.abs(Xi - Xj) 
+        # itens de cada evento: id inteiro da aresta (origem, destino); os
+        # mineradores recebem so os ids e o par original e recuperado apenas
+        # nas regras finais (ver decodificarRegras)
+        id_aresta = dataset['id_aresta'].to_numpy()
+        self.rotulos = self.rotulosArestas(id_aresta, dataset[origem].to_numpy(), dataset[destino].to_numpy())
 
         # janela de tempo dada pelo usuario dependendo da natureza dos dados
-        ## DEVE SER ADICIONADO AO WEB GUI
-        janela = {'days': 0, 'hours': 2, 'minutes': 00}
-
-        # numero de baldes que seriam gerados caso fosse usado a janela de tempo
-        num_baldes = 0
-        for i in range(0, len(dataset[metadata])-1):
-            if dataset[metadata][i+1] - dataset[metadata][i] > pd.Timedelta(days=float(janela['days']), hours=float(janela['hours']), minutes=float(janela['minutes'])):
-                num_baldes += 1
-
-        # calcular o numero de clusters ideal atraves da distancia entre os pontos e seus centroides
-        # atribui o kmin e kmax de acordo com o numero de baldes que seriam gerados
-        kmin = 2
-        kmax = num_baldes
-        sil = []
-
-        for k in tqdm(range(kmin, kmax+1), desc='Calculando melhor numero de clusters'):
-            kmeans = KMeans(n_clusters=k, random_state=32).fit(X_scaled)
-            labels = kmeans.labels_
-            sil.append(silhouette_score(distancias, labels, metric='precomputed'))
-
-        # pegar o cluster com o maior coeficiente de silhueta e plotar
-        best_cluster = sil.index(max(sil))
-        print(f'Melhor numero de clusters: {best_cluster}')
-
-
-        # plt.plot(range(kmin, kmax+1), sil)
-        # plt.xlabel('Number of clusters')
-        # plt.ylabel('Silhouette Score')
-        # plt.show()
-
-        # https://stackoverflow.com/questions/28344660/how-to-identify-cluster-labels-in-kmeans-scikit-learn
-        # mostrar os clusters de cada linha de acordo com o melhor cluster
-        # como a primeira posicao do vetor esta associado a kmin, basta:
-        kmeans = KMeans(n_clusters=best_cluster+kmin)
-        kmeans.fit(X_scaled)
-        labels = kmeans.labels_
+        timestamps = dataset['timestamp_seconds'].to_numpy()
+        janela = janela_em_segundos(self.janela_tempo)
+
+        if self.modo_baldes == 'janela_deslizante':
+            # janelas sobrepostas nao definem um cluster por evento, entao os
+            # baldes sao as proprias transacoes geradas sob demanda
+            self.historico_k = []
+            comprimento = janela if self.comprimento_janela is None else janela_em_segundos(self.comprimento_janela)
+            passo = comprimento / 2 if self.passo_janela is None else janela_em_segundos(self.passo_janela)
+            self.dados_com_cluster = dataset
+            self.baldes = janelasDeslizantes(timestamps, id_aresta, comprimento, passo)
+            self.persistir('dados_com_cluster', dataset)
+            return
+
+        if self.modo_baldes == 'sessao':
+            # cada sessao termina onde o intervalo entre eventos excede a janela
+            self.historico_k = []
+            labels = baldes_por_sessao(timestamps, janela)
+        else:
+            # numero de baldes que seriam gerados caso fosse usado a janela de tempo
+            num_baldes = len(cortes_por_sessao(timestamps, janela))
+
+            # calcular o numero de clusters ideal atraves da distancia entre os pontos e seus centroides
+            # atribui o kmin e kmax de acordo com o numero de baldes que seriam gerados
+            kmin = 2
+            kmax = min(num_baldes, len(timestamps) - 1)
+
+            if self.modo_baldes == 'streaming':
+                labels = self.kmeansStreamingLabels(timestamps, kmin, kmax)
+            else:
+                # Selecionar características relevantes, neste caso, a coluna 'timestamp_seconds' e o numero de vezes que cada item aparece
+                # X = dataset[['timestamp_seconds', 'contagem_ocorrencias']].values
+                X = dataset[['timestamp_seconds']].values
+
+                # Normalização dos dados
+                scaler = StandardScaler()
+                X_scaled = scaler.fit_transform(X)
+
+                # a silhueta é calculada direto sobre o vetor 1D (ver silhueta_1d),
+                # sem montar a matriz n x n de distancias, que nao cabe em memoria
+                # para datasets grandes
+
+                if self.modo_baldes == 'kmeans_otimo':
+                    labels = self.kmeansOtimoLabels(X_scaled, kmin, kmax)
+                else:
+                    labels = self.kmeansSklearnLabels(X_scaled, kmin, kmax)
 
         # #adicionar a coluna de clusters ao dataframe
         dataset['Cluster'] = labels # some improper dataset handling
@@ -118,31 +275,166 @@ class ruleFinder:
         # plt.show()
         self.dados_com_cluster = dataset
 
-        dataset = dataset[[origem, destino, 'Cluster']]
-        dataset.to_csv('dataset.csv')
-        # test this out later* https://stackoverflow.com/questions/77623855/how-to-match-labels-and-their-cluster-point-in-k-means-clusters
-        baldes = {}
-        for index, row in dataset.iterrows():
-            #print(list(row.values))
-            if row['Cluster'] not in baldes:
-                baldes[row['Cluster']] = []
-            baldes[row['Cluster']].append((row[origem], row[destino]))
-
-        all_buckets = []
-        for balde in baldes:
-            all_buckets.append(baldes[balde])
-
-        self.baldes = all_buckets
-        #i = 0
-        # for bucket in all_buckets:
-        #     print(f"Balde {i} de tamanho {len(bucket)}: {bucket}", '\n')
-        #     i += 1
+        self.persistir('dados_com_cluster', dataset)
+
+        # baldes em CSR: indptr + ids das arestas agrupados pelo cluster
+        self.baldes = baldesCSR.de_labels(labels, id_aresta)
+        self.persistir('baldes', self.baldes)
+
+    def rotulosArestas(self, id_aresta, origens, destinos):
+        # lista indexada pelo id da aresta com o par (origem, destino)
+        ids, primeiras = np.unique(id_aresta, return_index=True)
+        rotulos = [None] * (int(ids[-1]) + 1 if len(ids) else 0)
+        for i, o, d in zip(ids.tolist(), origens[primeiras].tolist(), destinos[primeiras].tolist()):
+            rotulos[i] = (o, d)
+        return rotulos
+
+    def decodificarRegras(self, regras, rotulos=None):
+        # troca os ids inteiros das arestas pelos pares (origem, destino)
+        if rotulos is None:
+            rotulos = self.rotulos
+        regras = regras.copy()
+        regras['Antecedente'] = [tuple(rotulos[i] for i in antecedente) for antecedente in regras['Antecedente'].tolist()]
+        regras['Consequente'] = [rotulos[i] for i in regras['Consequente'].tolist()]
+        return regras
+
+    def kmeansSklearnLabels(self, X_scaled, kmin, kmax):
+        # busca do melhor k em paralelo (um processo por ajuste do KMeans),
+        # do grosso para o fino e com parada antecipada; os labels do ajuste
+        # vencedor sao reaproveitados, sem reajustar o KMeans no final
+        with ProcessPoolExecutor(initializer=inicializar_busca, initargs=(X_scaled,)) as executor:
+            labels, self.historico_k = buscar_melhor_k(lambda ks: executor.map(avaliar_kmeans, ks), kmin, kmax)
+
+        melhor = max(self.historico_k, key=lambda h: h['silhueta'])
+        print(f'Melhor numero de clusters: {melhor["k"]} ({len(self.historico_k)} valores de k avaliados)')
+
+        # plt.plot([h['k'] for h in self.historico_k], [h['silhueta'] for h in self.historico_k])
+        # plt.xlabel('Number of clusters')
+        # plt.ylabel('Silhouette Score')
+        # plt.show()
+        return labels
+
+    def kmeansOtimoLabels(self, X_scaled, kmin, kmax):
+        # k-means 1D exato: todas as solucoes de kmin a kmax saem de uma unica
+        # programacao dinamica, sem sementes aleatorias e sem reajuste final
+        melhor_sil = None
+        melhores_labels = None
+        self.historico_k = []
+        limite = limitar_kmax_exato(kmin, kmax, len(X_scaled))
+        if limite < kmax:
+            print(f'kmax limitado de {kmax} para {limite} no k-means exato')
+            kmax = limite
+        inicio = time()
+        for k, labels in tqdm(kmeans_otimo_1d(X_scaled, kmin, kmax), total=max(kmax - kmin + 1, 0), desc='Calculando melhor numero de clusters'):
+            sil = silhueta_1d(X_scaled, labels)
+            self.historico_k.append({'k': k, 'silhueta': sil, 'tempo': time() - inicio})
+            inicio = time()
+            if melhor_sil is None or sil > melhor_sil:
+                melhor_sil = sil
+                melhores_labels = labels
+        if melhores_labels is None:
+            # kmax < kmin (a janela cobre todos os eventos) ou todos os
+            # timestamps iguais: um unico cluster
+            print('Nenhum k entre kmin e kmax; usando um unico cluster')
+            return np.zeros(len(X_scaled), dtype=np.int32)
+        print(f'Melhor numero de clusters: {len(np.unique(melhores_labels))}')
+        return melhores_labels
+
+    def kmeansStreamingLabels(self, timestamps, kmin, kmax):
+        # para datasets enormes: k e os centroides iniciais saem de uma amostra,
+        # os centroides sao refinados em mini-lotes e cada bloco do fluxo
+        # ordenado e atribuido por busca binaria nos pontos medios
+        labels, self.historico_k = kmeans_streaming_1d(timestamps, kmin, kmax)
+        if not self.historico_k:
+            print('Nenhum k entre kmin e kmax; usando um unico cluster')
+            return labels
+        print(f'Melhor numero de clusters: {max(self.historico_k, key=lambda h: h["silhueta"])["k"]} (escolhido na amostra)')
+        return labels
+
+    def minerarRegras(self, motor, all_buckets, min_repetition, min_confidence):
+        if self.alvo != 'regras':
+            return self.derivarRegras(self.minerarItemsets(motor, all_buckets, min_repetition), min_repetition, min_confidence)
+        if motor == 'arules':
+            return fim.arules(all_buckets, supp=-int(min_repetition), conf=min_confidence, report='abhC', zmin=2)
+        minerador = {'fpgrowth': fim.fpgrowth, 'apriori': fim.apriori, 'eclat': fim.eclat}[motor]
+        return minerador(all_buckets, supp=-int(min_repetition), conf=min_confidence, report='abhC', zmin=2, target='r')
+
+    def minerarItemsets(self, motor, all_buckets, min_repetition):
+        # itemsets (ids, suporte) de onde as regras sao derivadas: todos os
+        # frequentes no alvo 'regras', ou so os fechados/maximais. O arules
+        # so gera regras (e usa FP-growth por baixo), entao aqui ele e
+        # substituido pelo FP-growth.
+        # Com muitos baldes, a mineracao e feita em particoes de tempo em
+        # paralelo (ver son.py); os fechados/maximais saem dos frequentes.
+        num_particoes = self.numeroParticoes(len(all_buckets))
+        if num_particoes > 1:
+            nome = motor if motor in ('fpgrowth', 'apriori', 'eclat') else 'fpgrowth'
+            print(f'Minerando em {num_particoes} particoes ({nome})')
+            itemsets = minerar_particionado(all_buckets, int(min_repetition), nome, num_particoes)
+            if self.alvo == 'regras':
+                return itemsets
+            return filtrar_condensados(itemsets, ALVOS[self.alvo])
+        minerador = {'fpgrowth': fim.fpgrowth, 'apriori': fim.apriori, 'eclat': fim.eclat}.get(motor, fim.fpgrowth)
+        if self.alvo == 'regras':
+            return minerador(com_transacao_vazia(all_buckets), supp=-int(min_repetition), report='a', zmin=1, target='s')
+        return minerador(com_transacao_vazia(all_buckets), supp=-int(min_repetition), report='a', zmin=2, target=ALVOS[self.alvo])
+
+    def derivarRegras(self, itemsets, min_repetition, min_confidence):
+        # regras com um item no consequente a partir dos itemsets com suporte
+        # >= min_repetition. Com todos os frequentes, o suporte de antecedente
+        # e consequente ja esta entre eles; com fechados/maximais ele vem do
+        # indice vertical dos baldes. Uma regra vinda de um itemset
+        # fechado/maximal nunca e dominada por outra de antecedente maior,
+        # entao nesses alvos a poda de redundancia e dispensada. No modo top-k
+        # so as k melhores regras sao geradas (ver melhores_regras).
+        itemsets = [(itemset, suporte) for itemset, suporte in itemsets if suporte >= int(min_repetition)]
+        redundante = None
+        if self.alvo == 'regras':
+            suportes = {frozenset(itemset): suporte for itemset, suporte in itemsets}
+            vertical = []
+
+            def suporte(itemset):
+                # itemsets que o minerador nao reportou (ex.: os A + x
+                # consultados pela poda do top-k) saem do indice vertical
+                chave = frozenset(itemset)
+                if chave not in suportes:
+                    if not vertical:
+                        vertical.append(indiceVertical(self.baldes))
+                    suportes[chave] = vertical[0].suporte(chave)
+                return suportes[chave]
+            if self.top_k is not None:
+                # a poda tem que acontecer antes do heap, senao sobram menos de k
+                redundante = redundancia_por_fechamento(suporte, np.unique(self.baldes.itens).tolist())
+        else:
+            suporte = indiceVertical(self.baldes).suporte
+        if self.top_k is not None:
+            return melhores_regras(itemsets, suporte, min_confidence, self.top_k, self.criterio_top_k,
+                                   len(self.baldes), redundante)
+        return regras_de_itemsets(itemsets, suporte, min_confidence)
+
+    def minerarTopKFrequencia(self, motor, all_buckets, min_repetition, min_confidence):
+        # top-k por frequencia: toda regra com FR >= t sai dos itemsets com
+        # suporte >= t, entao a mineracao comeca com t igual ao numero de
+        # baldes e t cai pela metade (ate min_repetition) so enquanto o heap
+        # nao tem k regras. So os itemsets acima do FR da k-esima regra (ou
+        # pouco abaixo dele) sao minerados e guardados. Itemsets maximais
+        # dependem do suporte minimo e nao passam por aqui.
+        # Retorna (itemsets, suporte usado na mineracao, regras).
+        min_repetition = int(min_repetition)
+        suporte = max(min_repetition, len(all_buckets))
+        while True:
+            itemsets = self.minerarItemsets(motor, all_buckets, suporte)
+            regras = self.derivarRegras(itemsets, suporte, min_confidence)
+            if len(regras) >= self.top_k or suporte == min_repetition:
+                return itemsets, suporte, regras
+            suporte = max(min_repetition, suporte // 2)
+            print(f'Top-k: {len(regras)} de {self.top_k} regras; minerando de novo com suporte {suporte}')
 
     def assoctiationRulesFinder(self):
         # https://andrewm4894.com/2020/09/29/market-basket-analysis-in-python/
         all_buckets = self.baldes
 
-        print("Generating association rules through Apriori")
+        print(f"Generating association rules (motor: {self.motor}, alvo: {self.alvo})")
         min_repetition = self.min_repetition
         min_confidence  = self.min_confidence *100
         # Get classification rules by pyFim. From the pyFim doc:
@@ -153,76 +445,70 @@ class ruleFinder:
         columns_names = ['Consequente', 'Antecedente', 'FR', 'FA', 'FC', 'Conf']
         reordered_columns_names = ['Antecedente', 'Consequente', 'FR', 'FA', 'FC', 'Conf']
 
-        ti = time()
-        borgelt_rules = fim.arules(all_buckets, supp=-int(min_repetition), conf=min_confidence, report='abhC', zmin=2)
+        motor = self.motor
+        if self.itemsetsReaproveitaveis():
+            # so a confianca mudou (ou o suporte subiu): as regras saem dos
+            # itemsets da busca anterior, sem nova passada de mineracao
+            print('Reaproveitando os itemsets da busca anterior')
+            self.tempos_motores = {}
+            ti = time()
+            borgelt_rules = self.derivarRegras(self.itemsets, min_repetition, min_confidence)
+            print(f"Elapsed time \t(derivacao)\t: {time() - ti} s")
+        else:
+            if motor == 'auto':
+                motor = escolher_motor(*self.baldes.estatisticas())
+
+            if motor == 'benchmark':
+                # comparacao explicita dos quatro mineradores com os mesmos baldes
+                # e limiares; o resultado usado e o do arules
+                self.tempos_motores = {}
+                for nome in ('arules', 'fpgrowth', 'apriori', 'eclat'):
+                    ti = time()
+                    self.minerarRegras(nome, all_buckets, min_repetition, min_confidence)
+                    self.tempos_motores[nome] = time() - ti
+                    print(f"Elapsed time \t({nome})\t: {self.tempos_motores[nome]} s")
+
+            ti = time()
+            if self.top_k is not None and self.criterio_top_k == 'frequencia' and self.alvo != 'maximais' and motor != 'benchmark':
+                self.itemsets, self.min_rep_itemsets, borgelt_rules = self.minerarTopKFrequencia(motor, all_buckets, min_repetition, min_confidence)
+            else:
+                self.itemsets = self.minerarItemsets('arules' if motor == 'benchmark' else motor, all_buckets, min_repetition)
+                self.min_rep_itemsets = int(min_repetition)
+                borgelt_rules = self.derivarRegras(self.itemsets, min_repetition, min_confidence)
+            self.assinatura_itemsets = self.assinaturaItemsets()
+            # borgelt_rules_df.to_csv(f'association_rulesDF/association_rules_{motor}.csv')
+            if motor != 'benchmark':
+                self.tempos_motores = {motor: time() - ti}
+                print(f"Elapsed time \t({motor})\t: {self.tempos_motores[motor]} s")
+
         borgelt_rules_df = pd.DataFrame(borgelt_rules, columns=columns_names)
         borgelt_rules_df = borgelt_rules_df[reordered_columns_names]
-        # borgelt_rules_df.to_csv('association_rulesDF/association_rules_arules.csv')
-        print(f"Elapsed time \t(Arules)\t: {time() - ti} s")
-
-        ti = time()
-        borgelt_rules_fpgrowth = fim.fpgrowth(all_buckets, supp=-int(min_repetition), conf=min_confidence,
-                                              report='abhC', zmin=2, target='r')
-        borgelt_rules_df_fpgrowth  = pd.DataFrame(borgelt_rules_fpgrowth, columns=columns_names)
-        borgelt_rules_df_fpgrowth = borgelt_rules_df_fpgrowth[reordered_columns_names]
-        # borgelt_rules_df_fpgrowth.to_csv('association_rulesDF/association_rules_fpgrowth.csv')
-        print(f"Elapsed time \t(fpgrowth)\t: {time() - ti} s")
-
-        ti = time()
-        borgelt_rules_apriori = fim.apriori(all_buckets, supp=-int(min_repetition), conf=min_confidence, report='abhC',
-                                            zmin=2, target='r')
-        borgelt_rules_df_apriori  = pd.DataFrame(borgelt_rules_apriori, columns=columns_names)
-        borgelt_rules_df_apriori = borgelt_rules_df_apriori[reordered_columns_names]
-        # borgelt_rules_df_apriori.to_csv('association_rulesDF/association_rules_apriori.csv')
-        print(f"Elapsed time \t(apriori)\t: {time() - ti} s")
-
-        ti = time()
-        borgelt_rules_eclat = fim.eclat(all_buckets, supp=-int(min_repetition), conf=min_confidence, report='abhC',
-                                        zmin=2, target='r')
-        borgelt_rules_df_eclat  = pd.DataFrame(borgelt_rules_eclat, columns=columns_names)
-        borgelt_rules_df_eclat = borgelt_rules_df_eclat[reordered_columns_names]
-        # borgelt_rules_df_eclat.to_csv('association_rulesDF/association_rules_eclat.csv')
-        print(f"Elapsed time \t(eclat)\t: {time() - ti} s")
 
 
         t0 = time()
-        #truncar conf para 2 casas decimais
-        borgelt_rules_df['Conf'] = borgelt_rules_df['Conf'].apply(lambda x: round(x, 2))
-
         borgelt_rules_df = borgelt_rules_df.loc[borgelt_rules_df['FR'] >= int(min_repetition)]
         borgelt_rules_df.reset_index(inplace=True, drop=True)
 
+        # Conf arredondada e metricas de interesse (Lift, Leverage, Convicção,
+        # Jaccard) calculadas por coluna a partir de FR, FA e FC (ver metricas.py)
+        calcular_metricas(borgelt_rules_df, len(all_buckets))
+
 
 
-        # Função para verificar se um conjunto é subconjunto de outro
-        def is_subset(a, b):
-            return set(a).issubset(set(b))
-
-        # Lista para armazenar os índices das linhas a serem removidas
-        indices_remover = []
-
-        # Iterar sobre cada linha
-        for i, row in borgelt_rules_df.iterrows():
-            antecedente_atual = row['Antecedente']
-            consequente_atual = row['Consequente']
-            
-            # Verificar se existe outra linha com antecedente subconjunto e mesmo consequente
-            for j, other_row in borgelt_rules_df.iterrows():
-                if i != j:  # Evitar comparação com a mesma linha
-                    antecedente_outro = other_row['Antecedente']
-                    consequente_outro = other_row['Consequente']
-                    
-                    if is_subset(antecedente_atual, antecedente_outro) and consequente_atual == consequente_outro:
-                        # Além disso, verificar se as outras métricas são iguais ou menores
-                        if other_row['FR'] >= row['FR'] and other_row['FA'] >= row['FA'] and other_row['FC'] >= row['FC'] and other_row['Conf'] >= row['Conf']:
-                            indices_remover.append(i)
-                        break  # Parar de procurar outras correspondências
-
-        # Remover as linhas com os índices identificados
-        rules_found_df = borgelt_rules_df.drop(indices_remover)
-        rules_found_df.reset_index(inplace=True, drop=True)
-        print(f"Elapsed time \t(rest of code)\t: {time() - ti} s")
+        # Remover as regras redundantes: mesmo consequente, antecedente contido
+        # no de outra regra e métricas iguais ou menores (ver poda.py)
+        if self.alvo == 'regras' and self.top_k is None:
+            rules_found_df = borgelt_rules_df.loc[~mascara_regras_redundantes(borgelt_rules_df)].reset_index(drop=True)
+        else:
+            rules_found_df = borgelt_rules_df
+        # colunas numericas compactas; os pares (origem, destino) so voltam
+        # na copia decodificada entregue para exibicao
+        rules_found_df = rules_found_df.astype({'Consequente': np.int32, 'FR': np.int32, 'FA': np.int32, 'FC': np.int32})
+        self.regras_codificadas = rules_found_df
+        rules_found_df = self.decodificarRegras(rules_found_df)
+        print(f"Elapsed time \t(rest of code)\t: {time() - t0} s")
 
         # Resultado final
         #print(rules_found_df)
+        self.persistir('regras', rules_found_df)
         return rules_found_df
\ No newline at end of file
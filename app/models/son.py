@@ -0,0 +1,99 @@
+import math
+import itertools
+import fim
+from concurrent.futures import ProcessPoolExecutor
+from .baldes import baldesCSR
+from .janelas import janelasDeslizantes
+from .itemsets import indiceVertical
+
+# numero minimo de baldes para a mineracao particionada valer o custo dos processos
+MIN_BALDES_PARTICIONADO = 50000
+
+
+def suporte_local(min_repetition, tamanho, total):
+    # suporte minimo de uma particao com 'tamanho' dos 'total' baldes
+    return max(1, math.ceil(min_repetition * tamanho / total))
+
+
+def particionar(baldes, num_particoes):
+    # fatias consecutivas (em ordem de tempo) dos baldes; baldes CSR sao
+    # fatiados sem materializar as listas de itens e janelas deslizantes
+    # pelos indices das janelas, sem gerar as transacoes
+    if isinstance(baldes, janelasDeslizantes):
+        limites = [baldes.num_janelas * p // num_particoes for p in range(num_particoes + 1)]
+        return [baldes.fatia(inicio, termino) for inicio, termino in zip(limites[:-1], limites[1:])]
+    if isinstance(baldes, baldesCSR):
+        total = len(baldes)
+        limites = [total * p // num_particoes for p in range(num_particoes + 1)]
+        particoes = []
+        for inicio, termino in zip(limites[:-1], limites[1:]):
+            indptr = baldes.indptr[inicio:termino + 1]
+            particoes.append(baldesCSR(indptr - indptr[0], baldes.itens[indptr[0]:indptr[-1]]))
+        return particoes
+    transacoes = list(baldes)
+    limites = [len(transacoes) * p // num_particoes for p in range(num_particoes + 1)]
+    return [transacoes[inicio:termino] for inicio, termino in zip(limites[:-1], limites[1:])]
+
+
+def com_transacao_vazia(transacoes):
+    # o fim omite os itemsets formados so por itens presentes em todas as
+    # transacoes; uma transacao vazia a mais faz ele reportar todos, sem
+    # mudar nenhum suporte absoluto
+    return itertools.chain(transacoes, [[]])
+
+
+def minerar_particao(args):
+    # fase 1: itemsets localmente frequentes de uma particao
+    transacoes, minerador, min_local = args
+    minerador = getattr(fim, minerador)
+    return [itemset for itemset, _ in minerador(com_transacao_vazia(transacoes), supp=-min_local, report='a', zmin=1, target='s')]
+
+
+def contar_particao(args):
+    # fase 2: suporte exato de cada candidato dentro de uma particao
+    transacoes, candidatos = args
+    suporte = indiceVertical(transacoes).suporte
+    return [suporte(candidato) for candidato in candidatos]
+
+
+def minerar_particionado(baldes, min_repetition, minerador='fpgrowth', num_particoes=None):
+    # Mineracao SON: os baldes sao divididos em particoes consecutivas no
+    # tempo e cada processo minera a sua com o suporte proporcional
+    # ceil(s * n_i / N). Todo itemset globalmente frequente e localmente
+    # frequente em alguma particao, entao a uniao dos locais contem todos os
+    # globais; uma segunda passada conta o suporte exato dos candidatos em
+    # cada particao e descarta os que nao atingem s. O resultado e o mesmo
+    # da mineracao numa unica passada (itemsets frequentes com suporte).
+    # Com suporte local 1 cada particao enumeraria todos os subconjuntos de
+    # todos os baldes, entao o numero de particoes baixa ate o suporte local
+    # de todas ser >= 2; com uma so particao a mineracao e numa unica passada.
+    while True:
+        particoes = particionar(baldes, num_particoes)
+        tamanhos = [len(p) for p in particoes]
+        total = sum(tamanhos)
+        if num_particoes == 1 or min(suporte_local(min_repetition, t, total) for t in tamanhos) >= 2:
+            break
+        num_particoes -= 1
+    if num_particoes == 1:
+        return getattr(fim, minerador)(com_transacao_vazia(baldes), supp=-min_repetition, report='a', zmin=1, target='s')
+    with ProcessPoolExecutor(max_workers=len(particoes)) as executor:
+        locais = executor.map(minerar_particao, [(p, minerador, suporte_local(min_repetition, t, total))
+                                                 for p, t in zip(particoes, tamanhos)])
+        candidatos = list({frozenset(itemset): itemset for lista in locais for itemset in lista}.values())
+        contagens = executor.map(contar_particao, [(p, candidatos) for p in particoes])
+        suportes = [sum(c) for c in zip(*contagens)]
+    return [(itemset, suporte) for itemset, suporte in zip(candidatos, suportes) if suporte >= min_repetition]
+
+
+def filtrar_condensados(itemsets, alvo):
+    # fechados ('c') ou maximais ('m') a partir de todos os itemsets
+    # frequentes com suporte exato: basta olhar os superconjuntos imediatos
+    suportes = {frozenset(itemset): suporte for itemset, suporte in itemsets}
+    descartados = set()
+    for conjunto, suporte in suportes.items():
+        for item in conjunto:
+            subconjunto = conjunto - {item}
+            if alvo == 'm' or suportes.get(subconjunto) == suporte:
+                descartados.add(subconjunto)
+    return [(itemset, suporte) for itemset, suporte in itemsets
+            if len(itemset) >= 2 and frozenset(itemset) not in descartados]
@@ -0,0 +1,83 @@
+import time
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+class gerenciadorTarefas:
+    # tarefas longas (busca de regras) executadas num pool de processos
+    # local, fora da requisicao. Cada tarefa ganha um id; o andamento e
+    # consultado por status() e o retorno e entregue a ao_concluir. A funcao
+    # submetida recebe, alem dos seus argumentos, um dicionario compartilhado
+    # e o id da tarefa, onde pode registrar a etapa em que esta. O pool e o
+    # dicionario so sao criados na primeira tarefa.
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.executor = None
+        self.gerenciador = None
+        self.progresso = None
+        self.tarefas = {}
+        self.trava = threading.Lock()
+
+    def iniciar(self):
+        if self.executor is None:
+            self.gerenciador = multiprocessing.Manager()
+            self.progresso = self.gerenciador.dict()
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def registrar(self, futuro, ao_concluir=None, id_tarefa=None):
+        if id_tarefa is None:
+            id_tarefa = uuid.uuid4().hex
+        tarefa = {'futuro': futuro, 'inicio': time.time(), 'fim': None, 'erro': None}
+        with self.trava:
+            self.tarefas[id_tarefa] = tarefa
+
+        def concluir(futuro):
+            # o resultado e entregue antes de a tarefa aparecer como concluida;
+            # uma falha ao entregar (ex.: erro de disco) tambem encerra a tarefa
+            try:
+                if ao_concluir is not None and not futuro.cancelled() and futuro.exception() is None:
+                    ao_concluir(futuro.result())
+            except Exception as erro:
+                tarefa['erro'] = repr(erro)
+            finally:
+                tarefa['fim'] = time.time()
+        futuro.add_done_callback(concluir)
+        return id_tarefa
+
+    def submeter(self, funcao, *args, ao_concluir=None):
+        self.iniciar()
+        id_tarefa = uuid.uuid4().hex
+        futuro = self.executor.submit(funcao, *args, self.progresso, id_tarefa)
+        return self.registrar(futuro, ao_concluir, id_tarefa)
+
+    def concluida(self, resultado=None):
+        # tarefa ja resolvida (ex.: resultado em cache), com a mesma interface
+        futuro = Future()
+        futuro.set_result(resultado)
+        return self.registrar(futuro)
+
+    def status(self, id_tarefa):
+        tarefa = self.tarefas.get(id_tarefa)
+        if tarefa is None:
+            return None
+        futuro = tarefa['futuro']
+        fim = tarefa['fim'] if tarefa['fim'] is not None else time.time()
+        status = {'id': id_tarefa, 'tempo': fim - tarefa['inicio'], 'etapa': None, 'erro': None}
+        if tarefa['fim'] is not None:
+            if futuro.cancelled() or futuro.exception() is not None:
+                status['estado'] = 'erro'
+                status['erro'] = 'Tarefa cancelada' if futuro.cancelled() else repr(futuro.exception())
+            elif tarefa['erro'] is not None:
+                status['estado'] = 'erro'
+                status['erro'] = tarefa['erro']
+            else:
+                status['estado'] = 'concluida'
+        elif futuro.running() or futuro.done():
+            status['estado'] = 'executando'
+            if self.progresso is not None:
+                status['etapa'] = self.progresso.get(id_tarefa)
+        else:
+            status['estado'] = 'na_fila'
+        return status
@@ -2,16 +2,22 @@ from app import app
 from flask import render_template, redirect, request, jsonify
 from .models.modelos import Modelo
 from .haulm import Haulm
+from .models.metricas import METRICAS, filtrar_e_ordenar
+from .models.rulesFinder import MODOS_BALDES, MOTORES, ALVOS
+from .models.itemsets import CRITERIOS_TOP_K
+from .models.baldes import janela_em_segundos
+import numpy as np
 import pandas as pd
 import json
 import ast
+import time
+
+# filtros de valor minimo aceitos por /procurar_regras (parametro -> coluna)
+FILTROS_REGRAS = {'min_lift': 'Lift', 'min_leverage': 'Leverage', 'min_conviccao': 'Convicção', 'min_jaccard': 'Jaccard'}
 
 modelo = None
 haulm = None
-dados_originais_html = ''
 regras_html = ''
-regras_destacadas_no_original_html = ''
-regra_escolhida_destacada_html = ''
 
 @app.route('/')
 def index():
@@ -37,7 +43,6 @@ def param_regras():
 @app.route('/param_dados_received', methods=['POST'])
 def get_infos():
     global haulm
-    global dados_originais_html
     metadata = request.form['metadata']
     origem = request.form['origem']
     destino = request.form['destino']
@@ -52,29 +57,79 @@ def get_infos():
    
     haulm.set_dados_originais(data, metadata, origem, destino)
     haulm.set_dados_modificados(data, metadata, origem, destino)
-    dados_originais_html = data.to_html(classes='table table-striped')
 
     return render_template('menu.html')
 
+def validar_parametros_regras(comprimento_janela, passo_janela, modo_baldes, motor, alvo, top_k, criterio_top_k):
+    #mensagem de erro para os parametros que a busca recusaria, ou None
+    for nome, valor in (('comprimento da janela', comprimento_janela), ('passo da janela', passo_janela)):
+        if valor is None:
+            continue
+        try:
+            segundos = janela_em_segundos(valor)
+        except ValueError:
+            return f'Valor inválido para o {nome}: "{valor}". Use uma duração como "2h" ou "30min".'
+        if not segundos > 0:
+            return f'O {nome} deve ser maior que zero.'
+    if modo_baldes not in MODOS_BALDES or motor not in MOTORES or alvo not in ALVOS or criterio_top_k not in CRITERIOS_TOP_K:
+        return 'Erro ao carregar os dados. Verifique se os campos foram preenchidos corretamente.'
+    if top_k is not None:
+        try:
+            if int(top_k) < 1:
+                raise ValueError
+        except ValueError:
+            return 'O número de regras do top-k deve ser um inteiro maior ou igual a 1.'
+    return None
+
 @app.route('/param_regras_received', methods=['POST'])
 def get_infos_regras():
     global haulm
     min_repetition = request.form['min_rep']
     min_confidence = float(request.form['min_conf'])
     janela_tempo = request.form['janela_tempo']
+    modo_baldes = request.form.get('modo_baldes', 'kmeans')
+    comprimento_janela = request.form.get('comprimento_janela') or None
+    passo_janela = request.form.get('passo_janela') or None
+    motor = request.form.get('motor', 'auto')
+    alvo = request.form.get('alvo', 'regras')
+    top_k = request.form.get('top_k') or None
+    criterio_top_k = request.form.get('criterio_top_k', 'confianca')
 
     if min_repetition == '' or min_confidence == '' or janela_tempo == '':
         return render_template('param_regras.html', erro_msg='Erro ao carregar os dados. Verifique se os campos foram preenchidos corretamente.')
+
+    erro_msg = validar_parametros_regras(comprimento_janela, passo_janela, modo_baldes, motor, alvo, top_k, criterio_top_k)
+    if erro_msg is not None:
+        return render_template('param_regras.html', erro_msg=erro_msg)
     
-    print(min_repetition, min_confidence, janela_tempo)
-    haulm.set_regras_parametros(min_repetition, min_confidence, janela_tempo)
+    print(min_repetition, min_confidence, janela_tempo, modo_baldes, comprimento_janela, passo_janela, motor, alvo, top_k, criterio_top_k)
+    haulm.set_regras_parametros(min_repetition, min_confidence, janela_tempo, modo_baldes, comprimento_janela, passo_janela, motor, alvo, top_k, criterio_top_k)
 
     return render_template('menu.html')
 
+#dados originais paginados: cada pagina e renderizada so a partir da sua fatia
 @app.route('/dados_originais')
 def dados_originais():
-    global dados_originais_html
-    return render_template('dados_originais.html', dados_originais=dados_originais_html)
+    global haulm
+    init()
+    if haulm.modelo.dados_originais is None:
+        return render_template('dados_originais.html')
+    colunas = list(haulm.modelo.dados_originais.orderedData.columns)
+
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limite = min(max(request.args.get('limite', 100, type=int), 1), 1000)
+    ordenar = request.args.get('ordenar') or None
+    if ordenar not in colunas:
+        ordenar = None
+    crescente = request.args.get('ordem') != 'decrescente'
+    #filtros por coluna: parametro 'f_<coluna>' com um trecho do valor
+    filtros = {coluna: request.args['f_' + coluna] for coluna in colunas if request.args.get('f_' + coluna)}
+
+    pagina, total = haulm.get_pagina_dados_originais(offset, limite, ordenar, crescente, filtros)
+    parametros = {chave: valor for chave, valor in request.args.items() if chave != 'offset'}
+    return render_template('dados_originais.html', dados_originais=pagina.to_html(classes='table table-striped'),
+                           colunas=colunas, filtros=request.args, offset=offset, limite=limite, total=total,
+                           parametros=parametros)
 
 @app.route('/procurar_regras')
 def procurar_regras():
@@ -96,7 +151,62 @@ def procurar_regras():
     except:
         pass    
 
-    return render_template('regras_encontradas.html', regras=regras_result)
+    #ordenacao e filtros pelas metricas, feitos no servidor sobre a tabela toda
+    ordenar = request.args.get('ordenar') or None
+    crescente = request.args.get('ordem') == 'crescente'
+    minimos = {}
+    for parametro, coluna in FILTROS_REGRAS.items():
+        try:
+            minimos[coluna] = float(request.args[parametro])
+        except (KeyError, ValueError):
+            pass
+    if ordenar not in regras_result.columns:
+        ordenar = None
+    regras_filtradas = filtrar_e_ordenar(regras_result, ordenar, crescente, minimos)
+
+    return render_template('regras_encontradas.html', regras=regras_filtradas, metricas=METRICAS, filtros=request.args,
+                           historico_k=haulm.get_historico_k(), tempos_motores=haulm.get_tempos_motores())
+
+#busca de regras em segundo plano: a pagina cria a tarefa, acompanha o
+#status e, ao final, abre /procurar_regras, que le o resultado do cache
+@app.route('/buscando_regras')
+def buscando_regras():
+    init()
+    return render_template('buscando_regras.html')
+
+@app.route('/tarefas/procurar_regras', methods=['POST'])
+def criar_tarefa_regras():
+    global haulm
+    if haulm.modelo.dados_modificados is None or haulm.modelo.buscador_regras is None:
+        return jsonify({'erro': 'Selecione os parâmetros dos dados e das regras antes da busca.'}), 400
+    id_tarefa = haulm.submeter_busca_regras()
+    return jsonify({'id': id_tarefa}), 202
+
+@app.route('/tarefas/<id_tarefa>')
+def status_tarefa(id_tarefa):
+    global haulm
+    status = haulm.get_status_busca(id_tarefa)
+    if status is None:
+        return jsonify({'erro': 'Tarefa inexistente.'}), 404
+    return jsonify(status)
+
+@app.route('/tarefas/<id_tarefa>/resultado')
+def resultado_tarefa(id_tarefa):
+    global haulm
+    status = haulm.get_status_busca(id_tarefa)
+    if status is None:
+        return jsonify({'erro': 'Tarefa inexistente.'}), 404
+    if status['estado'] == 'erro':
+        return jsonify(status), 500
+    if status['estado'] != 'concluida':
+        return jsonify(status), 202
+    regras = haulm.get_resultado_busca(id_tarefa)
+    if regras is None:
+        return jsonify({'erro': 'Resultado da tarefa nao esta mais disponivel.'}), 410
+    #convicção infinita nao existe em JSON
+    metricas = regras[list(METRICAS)]
+    regras[list(METRICAS)] = metricas.astype(object).where(np.isfinite(metricas), None)
+    return jsonify({'id': id_tarefa, 'regras': regras.to_dict(orient='records')})
 
 @app.route('/itemsets_frequentes')
 def itemsets_frequentes():
@@ -105,172 +215,113 @@ def itemsets_frequentes():
     print('Itemsets tree view: ', itemsets_tree_view)
 
     if itemsets_tree_view:
-        return render_template('itemsets_treeview.html', tree=itemsets_tree_view)
+        return render_template('itemsets_treeview.html', num_nos=len(itemsets_tree_view))
     
     if itemsets is None:
         return render_template('itemsets_frequentes.html', erro_msg='Nenhum itemset encontrado. Tente novamente com outros parâmetros.')
 
     return render_template('itemsets_frequentes.html', itemsets=itemsets)
 
+#filhos de um no da arvore de itemsets, paginados; sem 'no' devolve as raizes
+@app.route('/arvore_itemsets/filhos')
+def arvore_itemsets_filhos():
+    global haulm
+    inicio = time.time()
+    try:
+        no = request.args.get('no', type=int)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limite = min(max(request.args.get('limite', 100, type=int), 1), 1000)
+        pagina = haulm.get_filhos_arvore(no, offset, limite)
+    except IndexError:
+        return jsonify({'erro': 'No inexistente.'}), 404
+    if pagina is None:
+        return jsonify({'erro': 'Nenhuma arvore de itemsets gerada.'}), 404
+    return jsonify(dict(pagina, tempo_servidor=time.time() - inicio))
+
+# Função para gerar a tabela HTML com destaque nas linhas desejadas
+def gerar_tabela_html(df, destacar, cor):
+    html = '<table border="1">'
+    # Cabeçalho da tabela
+    html += '<thead><tr>'
+    for col in df.columns:
+        html += '<th>{}</th>'.format(col)
+    html += '</tr></thead>'
+    # Corpo da tabela
+    html += '<tbody>'
+    for row, destacada in zip(df.itertuples(index=False), destacar):
+        html += '<tr style="background-color: {};">'.format(cor) if destacada else '<tr>'
+        for value in row:
+            html += '<td>{}</td>'.format(value)
+        html += '</tr>'
+    html += '</tbody></table>'
+    return html
+
+#uma pagina dos dados originais com as linhas da mascara destacadas;
+#'apenas_destacadas' mostra so as linhas destacadas
+def renderizar_destaque(mascara, cor):
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limite = min(max(request.args.get('limite', 100, type=int), 1), 1000)
+    apenas_destacadas = request.args.get('apenas_destacadas') == '1'
+
+    dados_originais = haulm.get_dados_originais_ordenados()
+    posicoes = np.flatnonzero(mascara) if apenas_destacadas else np.arange(len(dados_originais))
+    total = len(posicoes)
+    posicoes = posicoes[offset:offset + limite]
+    html = gerar_tabela_html(dados_originais.iloc[posicoes], mascara[posicoes], cor)
+
+    parametros = {chave: valor for chave, valor in request.args.items() if chave != 'offset'}
+    return render_template('regras_destacadas_no_original.html', regras_destacadas_no_original=html,
+                           offset=offset, limite=limite, total=total, num_destacadas=int(mascara.sum()),
+                           apenas_destacadas=apenas_destacadas, parametros=parametros)
+
 @app.route('/regras_destacadas_no_original')
 def regras_destacadas_no_original():
     global haulm
-    global regras_destacadas_no_original_html
 
     regras = haulm.get_regras()
     dados_originais = haulm.get_dados_originais_ordenados()
-    antecedente = haulm.modelo.dados_originais.origem
-    consequente = haulm.modelo.dados_originais.destino
 
     if regras is None:
         return render_template('regras_destacadas_no_original.html', erro_msg='Nenhuma regra encontrada. Tente novamente com outros parâmetros.')
     elif dados_originais is None:
         return render_template('regras_destacadas_no_original.html', erro_msg='Erro ao carregar os dados originais. Tente novamente.')
-    transacoes_suspeitas = []
-    #retirar das regras os pares de antecedente e consequente
-    for index, row in regras.iterrows():
-        for elementos in row['Antecedente']:
-            transacoes_suspeitas.append(elementos)
-        transacoes_suspeitas.append(row['Consequente'])
-
-    #retirar os elementos repetidos
-    print(transacoes_suspeitas)
-    transacoes_suspeitas = list(set(transacoes_suspeitas))
-    print('Transações suspeitas unicas:\n')
-    print(transacoes_suspeitas)
-
-    #criar um dataframe com os elementos suspeitos
-
-    df_sus = pd.DataFrame(transacoes_suspeitas, columns=[antecedente, consequente])
-    print('Dataframe com os elementos suspeitos:\n')
-    print(df_sus)
-    #criar um dataframe com os dados originais
-    df_orig = dados_originais.copy()
-
-    def find_rows_to_highlight(df_orig, df_sus):
-        # Lista para armazenar as linhas que devem ser destacadas
-        rows_to_highlight = []
-
-        # Iterar sobre cada linha do dataframe original
-        for i, row in df_orig.iterrows():
-            # Verificar se a linha atual contém algum dos elementos suspeitos
-            for j, sus_row in df_sus.iterrows():
-                if (row[antecedente] == sus_row[antecedente] and row[consequente] == sus_row[consequente]):
-                    rows_to_highlight.append(i)
-                    break
-        
-        return rows_to_highlight
-
-    # Função para gerar a tabela HTML com destaque nas linhas desejadas
-    def gerar_tabela_html(df, indices_destacar):
-        html = '<table border="1">'
-        # Cabeçalho da tabela
-        html += '<thead><tr>'
-        for col in df.columns:
-            html += '<th>{}</th>'.format(col)
-        html += '</tr></thead>'
-        # Corpo da tabela
-        html += '<tbody>'
-        for index, row in df.iterrows():
-            html += '<tr style="background-color: yellow;">' if index in indices_destacar else '<tr>'
-            for value in row:
-                html += '<td>{}</td>'.format(value)
-            html += '</tr>'
-        html += '</tbody></table>'
-        return html
-    
-    rows_to_highlight = find_rows_to_highlight(df_orig, df_sus)
-    print('{} linhas a serem destacadas:\n'.format(len(rows_to_highlight)))
 
-    print(rows_to_highlight)
+    #linhas cujas arestas (origem, destino) aparecem em alguma regra
+    mascara = haulm.get_mascara_destaque()
+    print('{} linhas a serem destacadas'.format(int(mascara.sum())))
 
-    regras_destacadas_no_original_html = gerar_tabela_html(df_orig, rows_to_highlight)
-    
-    return render_template('regras_destacadas_no_original.html', regras_destacadas_no_original=regras_destacadas_no_original_html)
+    return renderizar_destaque(mascara, 'yellow')
 
 
 
 @app.route('/destacar_regra', methods=['POST'])
 def destacar_regra():
     global haulm
-    global regra_escolhida_destacada_html
     antecedentes_da_regra = request.form['antecedente']
     consequente_da_regra = request.form['consequente']
     antecedentes_da_regra = ast.literal_eval(antecedentes_da_regra)
     consequente_da_regra = ast.literal_eval(consequente_da_regra)
 
-    dados_originais = haulm.get_dados_originais_ordenados()
-    dados_com_cluster = haulm.get_dados_com_cluster()
-    print(dados_com_cluster)
-    antecedente = haulm.modelo.dados_originais.origem
-    consequente = haulm.modelo.dados_originais.destino
-
-    transacoes_suspeitas = []
-    for elemento in antecedentes_da_regra:
-        print(elemento)
-        transacoes_suspeitas.append(elemento)
+    transacoes_suspeitas = list(antecedentes_da_regra)
     transacoes_suspeitas.append(consequente_da_regra)
 
     # #retirar os elementos repetidos
-    print(transacoes_suspeitas)
     transacoes_suspeitas = list(set(transacoes_suspeitas))
     print('Transações suspeitas unicas:\n')
     print(transacoes_suspeitas)
 
-    #criar um dataframe com os elementos suspeitos
-
-    df_sus = pd.DataFrame(transacoes_suspeitas, columns=[antecedente, consequente])
-    print('Dataframe com os elementos suspeitos:\n')
-    print(df_sus)
-    #criar um dataframe com os dados originais
-    df_orig = dados_originais.copy()
-
-    def find_rows_to_highlight(df_orig, df_sus):
-        # Lista para armazenar as linhas que devem ser destacadas
-        rows_to_highlight = []
-
-        # Iterar sobre cada linha do dataframe original
-        for i, row in df_orig.iterrows():
-            # Verificar se a linha atual contém algum dos elementos suspeitos
-            for j, sus_row in df_sus.iterrows():
-                if (row[antecedente] == sus_row[antecedente] and row[consequente] == sus_row[consequente]):
-                    rows_to_highlight.append(i)
-                    break
-        
-        return rows_to_highlight
-
-    # Função para gerar a tabela HTML com destaque nas linhas desejadas
-    def gerar_tabela_html(df, indices_destacar):
-        html = '<table border="1">'
-        # Cabeçalho da tabela
-        html += '<thead><tr>'
-        for col in df.columns:
-            html += '<th>{}</th>'.format(col)
-        html += '</tr></thead>'
-        # Corpo da tabela
-        html += '<tbody>'
-        for index, row in df.iterrows():
-            html += '<tr style="background-color: #FFCCCB;">' if index in indices_destacar else '<tr>'
-            for value in row:
-                html += '<td>{}</td>'.format(value)
-            html += '</tr>'
-        html += '</tbody></table>'
-        return html
-    
-    rows_to_highlight = find_rows_to_highlight(df_orig, df_sus)
-    print('Linhas a serem destacadas:')
-
-    print(rows_to_highlight)
-
-    regra_escolhida_destacada_html = gerar_tabela_html(df_orig, rows_to_highlight)
+    haulm.set_regra_escolhida(transacoes_suspeitas)
 
     #retornar sucesso
     return 'Sucesso'
 
 @app.route('/mostrar_regra_escolhida_destacada')
 def mostrar_regra_escolhida_destacada():
-    global regra_escolhida_destacada_html
-    return render_template('regras_destacadas_no_original.html', regras_destacadas_no_original=regra_escolhida_destacada_html)
+    global haulm
+    mascara = haulm.get_mascara_regra_escolhida()
+    if mascara is None:
+        return render_template('regras_destacadas_no_original.html', erro_msg='Nenhuma regra escolhida.')
+    return renderizar_destaque(mascara, '#FFCCCB')
 
 
 def init():
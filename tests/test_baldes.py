@@ -0,0 +1,89 @@
+import itertools
+import numpy as np
+import pytest
+from sklearn.metrics import silhouette_score
+from app.models.baldes import silhueta_1d, kmeans_otimo_1d, buscar_melhor_k
+
+
+def soma_dos_quadrados(x, labels):
+    return sum(((x[labels == c] - x[labels == c].mean()) ** 2).sum() for c in np.unique(labels))
+
+
+def melhor_soma_por_forca_bruta(x, k):
+    # menor soma dos quadrados entre todas as divisoes do vetor ordenado em k intervalos
+    x = np.sort(x)
+    melhor = np.inf
+    for cortes in itertools.combinations(range(1, len(x)), k - 1):
+        limites = (0,) + cortes + (len(x),)
+        melhor = min(melhor, sum(((x[i:j] - x[i:j].mean()) ** 2).sum() for i, j in zip(limites[:-1], limites[1:])))
+    return melhor
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_silhueta_1d_igual_a_do_scikit_learn(semente):
+    rng = np.random.default_rng(semente)
+    x = np.round(rng.normal(size=300), 1)
+    # clusters contiguos (como no KMeans 1D) e clusters intercalados
+    contiguos = np.searchsorted(np.sort(rng.choice(x, 4, replace=False)), x)
+    intercalados = rng.integers(0, 4, len(x))
+    for labels in (contiguos, intercalados):
+        esperado = silhouette_score(x.reshape(-1, 1), labels)
+        assert silhueta_1d(x, labels) == pytest.approx(esperado, abs=1e-9)
+
+
+def test_silhueta_1d_rejeita_um_unico_cluster():
+    with pytest.raises(ValueError):
+        silhueta_1d(np.arange(10.0), np.zeros(10))
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_kmeans_otimo_1d_igual_a_forca_bruta(semente):
+    rng = np.random.default_rng(semente)
+    x = rng.integers(0, 20, 12).astype(float)
+    ks = []
+    for k, labels in kmeans_otimo_1d(x, 2, 5):
+        ks.append(k)
+        assert len(np.unique(labels)) == k
+        assert soma_dos_quadrados(x, labels) == pytest.approx(melhor_soma_por_forca_bruta(x, k))
+    assert ks == [k for k in range(2, 6) if k <= len(np.unique(x))]
+
+
+def test_kmeans_otimo_1d_sem_k_valido():
+    assert list(kmeans_otimo_1d(np.arange(10.0), 3, 2)) == []
+    assert list(kmeans_otimo_1d(np.ones(10), 2, 5)) == []
+
+
+def avaliador(silhueta, avaliados):
+    # avaliar_lote sintetico: a silhueta de cada k vem de uma funcao e os
+    # labels sao o proprio k
+    def avaliar_lote(ks):
+        avaliados.append(list(ks))
+        return [(k, silhueta(k), 0.0, k) for k in ks]
+    return avaliar_lote
+
+
+@pytest.mark.parametrize('kmax', [30, 200, 2000])
+@pytest.mark.parametrize('pico', [2, 17, 25])
+def test_buscar_melhor_k_acha_o_pico(kmax, pico):
+    avaliados = []
+    labels, historico = buscar_melhor_k(avaliador(lambda k: -abs(k - pico), avaliados), 2, kmax)
+    assert labels == pico
+    assert [h['k'] for h in historico] == sorted({k for lote in avaliados for k in lote})
+    assert all(len(lote) <= 8 for lote in avaliados)
+
+
+@pytest.mark.parametrize('kmax', [30, 200, 2000])
+def test_buscar_melhor_k_para_cedo(kmax):
+    # silhueta caindo com k: depois do primeiro lote, 'paciencia' lotes sem
+    # melhora encerram a varredura antes do fim da grade
+    avaliados = []
+    labels, _ = buscar_melhor_k(avaliador(lambda k: -k, avaliados), 2, kmax)
+    assert labels == 2
+    varredura = [k for lote in avaliados[:3] for k in lote]
+    assert max(varredura) < kmax
+    assert max(k for lote in avaliados for k in lote) < kmax
+
+
+def test_buscar_melhor_k_com_kmax_menor_que_kmin():
+    labels, historico = buscar_melhor_k(avaliador(lambda k: 0.5, []), 2, 1)
+    assert labels == 2 and [h['k'] for h in historico] == [2]
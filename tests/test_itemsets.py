@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from app.models.baldes import baldesCSR
+from app.models.rulesFinder import ruleFinder
+
+
+def buscador(baldes, top_k=None):
+    regras = ruleFinder('Dias', 2, 0.1)
+    regras.set_particoes(1)
+    regras.set_top_k(top_k)
+    regras.baldes = baldesCSR(np.concatenate(([0], np.cumsum([len(b) for b in baldes]))), [i for b in baldes for i in b])
+    regras.rotulos = list(range(max(regras.baldes.itens) + 1))
+    return regras
+
+
+def conjunto_de_regras(regras):
+    return {(frozenset(a), c, fr, fa, fc) for a, c, fr, fa, fc in
+            zip(regras['Antecedente'], regras['Consequente'], regras['FR'], regras['FA'], regras['FC'])}
+
+
+@pytest.mark.parametrize('baldes', [
+    # 1 e 2 aparecem em todos os baldes
+    [[1, 2, 3], [1, 2], [1, 2, 3, 4], [1, 2, 4], [1, 2, 3, 4], [1, 2, 5]],
+    [[1, 2], [2, 3], [1, 2, 3], [3, 4], [1, 3, 4], [2, 4], [1, 2, 4]],
+])
+def test_top_k_sem_limite_igual_a_poda(baldes):
+    # com k maior que o numero de regras, o top-k devolve as mesmas regras
+    # que a poda de redundancia (mascara_regras_redundantes)
+    podadas = buscador(baldes).assoctiationRulesFinder()
+    top_k = buscador(baldes, top_k=10000).assoctiationRulesFinder()
+    assert conjunto_de_regras(top_k) == conjunto_de_regras(podadas)
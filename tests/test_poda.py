@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.models.poda import mascara_regras_redundantes
+
+
+def mascara_por_pares(regras):
+    # laco O(R^2) que a poda indexada substituiu
+    mascara = np.zeros(len(regras), dtype=bool)
+    for i, regra in regras.iterrows():
+        for j, outra in regras.iterrows():
+            if i != j and set(regra['Antecedente']) <= set(outra['Antecedente']) and regra['Consequente'] == outra['Consequente']:
+                if outra['FR'] >= regra['FR'] and outra['FA'] >= regra['FA'] and outra['FC'] >= regra['FC'] and outra['Conf'] >= regra['Conf']:
+                    mascara[i] = True
+                    break
+    return mascara
+
+
+@pytest.mark.parametrize('semente', range(10))
+def test_poda_igual_ao_laco_por_pares(semente):
+    rng = np.random.default_rng(semente)
+    num_regras = 80
+    regras = pd.DataFrame({
+        'Antecedente': [tuple(rng.choice(8, rng.integers(1, 4), replace=False).tolist()) for _ in range(num_regras)],
+        'Consequente': rng.integers(0, 3, num_regras),
+        # poucos valores distintos, para haver empates nas metricas
+        'FR': rng.integers(2, 5, num_regras),
+        'FA': rng.integers(4, 7, num_regras),
+        'FC': rng.integers(4, 7, num_regras),
+    })
+    regras['Conf'] = np.round(100 * regras['FR'] / regras['FA'], 2)
+    np.testing.assert_array_equal(mascara_regras_redundantes(regras), mascara_por_pares(regras))
+
+
+def test_poda_sem_regras():
+    regras = pd.DataFrame(columns=['Antecedente', 'Consequente', 'FR', 'FA', 'FC', 'Conf'])
+    assert len(mascara_regras_redundantes(regras)) == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from app.models.reticulado import reticuladoItemsets
+
+
+def hasse_por_forca_bruta(conjuntos):
+    # filhos de cada itemset: subconjuntos proprios sem outro subconjunto da
+    # colecao entre eles
+    filhos = []
+    for a in conjuntos:
+        subconjuntos = [b for b in conjuntos if b < a]
+        filhos.append({b for b in subconjuntos if not any(b < c for c in subconjuntos)})
+    return filhos
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_ligacoes_iguais_a_forca_bruta(semente):
+    rng = np.random.default_rng(semente)
+    itemsets = [tuple(f'i{i}' for i in rng.choice(7, rng.integers(1, 5), replace=False)) for _ in range(60)]
+    reticulado = reticuladoItemsets([(itens, None) for itens in itemsets])
+
+    conjuntos = [frozenset(itens) for itens, _ in reticulado.nos]
+    assert len(conjuntos) == len(set(conjuntos)) == len({frozenset(i) for i in itemsets})
+    esperado = hasse_por_forca_bruta(conjuntos)
+    for no, filhos in enumerate(reticulado.filhos):
+        assert {conjuntos[f] for f in filhos} == esperado[no]
+    raizes = {no for no, a in enumerate(conjuntos) if not any(a < b for b in conjuntos)}
+    assert set(reticulado.raizes) == raizes
+
+
+def test_pagina_filhos():
+    reticulado = reticuladoItemsets([(('a', 'b', 'c'), 3), (('a', 'b'), 4), (('b', 'c'), 5), (('a', 'c'), 6)])
+    pagina = reticulado.pagina_filhos(None)
+    assert pagina['total'] == 1 and pagina['nos'][0]['itens'] == ['a', 'b', 'c']
+    pagina = reticulado.pagina_filhos(pagina['nos'][0]['id'], offset=1, limite=1)
+    assert pagina['total'] == 3 and len(pagina['nos']) == 1
+    with pytest.raises(IndexError):
+        reticulado.pagina_filhos(10)
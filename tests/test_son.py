@@ -0,0 +1,62 @@
+import fim
+import numpy as np
+import pytest
+from app.models.baldes import baldesCSR
+from app.models.janelas import janelasDeslizantes
+from app.models.son import minerar_particionado, particionar, suporte_local
+
+
+def frequentes(baldes, min_repetition):
+    # mineracao numa unica passada, referencia da mineracao particionada; a
+    # transacao vazia faz o fim reportar tambem itens presentes em todas
+    return {frozenset(itemset): suporte for itemset, suporte in
+            fim.fpgrowth(list(baldes) + [[]], supp=-min_repetition, report='a', zmin=1, target='s')}
+
+
+def eventos(semente, n=3000):
+    rng = np.random.default_rng(semente)
+    return np.sort(rng.uniform(0, 10000, n)).round(), rng.integers(0, 60, n)
+
+
+@pytest.mark.parametrize('num_particoes', [2, 3, 5])
+def test_particionado_igual_a_uma_passada_em_baldes_csr(num_particoes):
+    timestamps, itens = eventos(num_particoes)
+    baldes = baldesCSR.de_labels((timestamps // 10).astype(np.int64), itens)
+    resultado = {frozenset(i): s for i, s in minerar_particionado(baldes, 3, 'fpgrowth', num_particoes)}
+    assert resultado == frequentes(baldes, 3)
+
+
+@pytest.mark.parametrize('num_particoes', [2, 3, 5])
+def test_particionado_igual_a_uma_passada_em_janelas(num_particoes):
+    timestamps, itens = eventos(num_particoes)
+    janelas = janelasDeslizantes(timestamps, itens, 15, 6)
+    resultado = {frozenset(i): s for i, s in minerar_particionado(janelas, 4, 'fpgrowth', num_particoes)}
+    assert resultado == frequentes(janelas, 4)
+
+
+def test_fatias_das_janelas_cobrem_as_mesmas_transacoes():
+    # janelas repetidas na fronteira entre fatias continuam emitidas uma vez
+    timestamps, itens = eventos(0)
+    janelas = janelasDeslizantes(timestamps, itens, 15, 5)
+    fatias = particionar(janelas, 7)
+    assert [t for fatia in fatias for t in fatia] == list(janelas)
+    assert sum(len(fatia) for fatia in fatias) == len(janelas)
+
+
+def test_suporte_local_nao_cai_para_1():
+    # com s=2 qualquer divisao daria suporte local 1: a mineracao e numa
+    # unica passada, com o mesmo resultado
+    timestamps, itens = eventos(1)
+    baldes = baldesCSR.de_labels((timestamps // 10).astype(np.int64), itens)
+    assert suporte_local(2, len(baldes) // 8, len(baldes)) == 1
+    resultado = {frozenset(i): s for i, s in minerar_particionado(baldes, 2, 'fpgrowth', 8)}
+    assert resultado == frequentes(baldes, 2)
+
+
+def test_item_em_todos_os_baldes_de_uma_particao():
+    # 8 e 9 aparecem em todos os baldes da primeira particao e em nenhum da
+    # segunda: o fim os omitiria dos candidatos locais
+    baldes = [[8, 9, 1], [8, 9, 2], [8, 9, 1, 2], [8, 9, 3], [1, 2], [2, 3], [1, 3], [1, 2, 3]]
+    resultado = {frozenset(i): s for i, s in minerar_particionado(baldes, 4, 'fpgrowth', 2)}
+    assert resultado[frozenset((8, 9))] == 4
+    assert resultado == frequentes(baldes, 4)